@@ -0,0 +1,86 @@
+import json
+import platform
+import statistics
+import sys
+import timeit
+from typing import Callable, Dict
+
+import numpy as np
+
+
+def bench(func: Callable[[], object], repeat: int = 5, number: int = None) -> Dict[str, float]:
+    """
+    Time func, returning seconds per call. The number of calls per repeat is
+    picked by timeit so each repeat takes at least 0.2s, unless given.
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number, _ = timer.autorange()
+
+    times = [t / number for t in timer.repeat(repeat, number)]
+
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "mean": statistics.mean(times),
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat
+    }
+
+
+def metadata() -> Dict[str, str]:
+    return {
+        "python": sys.version.split()[0],
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor()
+    }
+
+
+def save(path: str, results: Dict[str, Dict[str, float]]):
+    with open(path, "w") as f:
+        json.dump({"meta": metadata(), "results": results}, f, indent=2, sort_keys=True)
+
+
+def load(path: str) -> Dict[str, Dict[str, float]]:
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            tolerance: float = 0.2) -> bool:
+    """
+    Print the fastest time of each benchmark against the baseline, returning
+    False if any is more than `tolerance` slower than its baseline. The
+    minimum is used as it is the least affected by other load on the machine.
+    """
+    ok = True
+    width = max(len(name) for name in results)
+
+    print("%-*s %12s %12s %8s" % (width, "benchmark", "baseline", "current", "ratio"))
+    for name, result in sorted(results.items()):
+        current = result["min"]
+        if name not in baseline:
+            print("%-*s %12s %12s %8s" % (width, name, "-", formatTime(current), "new"))
+            continue
+
+        previous = baseline[name]["min"]
+        ratio = current / previous
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            ok = False
+
+        print("%-*s %12s %12s %7.2fx%s" % (width, name, formatTime(previous), formatTime(current), ratio, flag))
+
+    return ok
+
+
+def formatTime(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return "%.3g %s" % (seconds / scale, unit)
+
+    return "%.3g ns" % (seconds / 1e-9)
@@ -0,0 +1,222 @@
+"""
+Offscreen render benchmark of the game's worlds. MyApp is started with an
+offscreen buffer and a software renderer, so it runs without a display or a
+GPU, and each world is flown by a script of key presses for a number of
+frames. The clock advances a fixed 1/60 s a frame, so every run flies the
+same flight whatever the speed of the machine.
+
+Every frame is timed, and every `--sample` frames the draw calls, counted as
+the Geoms culled for drawing, and the size of the scene graph are recorded,
+catching scenes which grow as the flight goes on. Run from the repository
+root
+
+    python -m benchmarks.render --frames 5000
+    python -m benchmarks.render --world tutorial1 --display p3tinydisplay
+    python -m benchmarks.render --save-baseline
+    python -m benchmarks.render --compare
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Sequence, Tuple
+
+from panda3d.core import ClockObject, Filename, MouseWatcher, SceneGraphAnalyzer, loadPrcFileData
+
+from benchmarks.harness import compare, load, metadata
+
+RESULTS = os.path.join(os.path.dirname(__file__), "results")
+
+# Frames a second of the fixed clock, one simulation tick a frame
+FRAME_RATE = 60
+
+# Key presses of each world, (frame, key, held), sorted by frame
+SCRIPTS: Dict[str, List[Tuple[int, str, bool]]] = {
+    # A circle at constant height, twisted and untwisted every 1000 frames, so the flight never ends
+    "sandbox": [(0, "curv+", True), (10, "curv+", False)] + [
+        event for start in range(1000, 100000, 1000)
+        for event in ((start, "tor+", True), (start + 5, "tor+", False),
+                      (start + 300, "tor-", True), (start + 305, "tor-", False))
+    ],
+    # Straight to the first ring then around the circle, finishing after about 4900 frames
+    "tutorial1": [(695, "curv+", True), (705, "curv+", False)]
+}
+
+
+def configure(display: str, size: Tuple[int, int]):
+    """ An offscreen buffer on the software renderer, falling back to tinydisplay """
+    loadPrcFileData("", "\n".join((
+        "window-type offscreen",
+        "load-display %s" % display,
+        "aux-display p3tinydisplay",
+        "win-size %d %d" % size,
+        "audio-library-name null",
+        "sync-video false",
+        # Assets are loaded relative to the repository root rather than this script
+        "model-path %s" % Filename.fromOsSpecific(os.getcwd()).getFullpath()
+    )))
+
+
+def drawCalls(app) -> int:
+    """ Geoms culled for drawing in the last frame, one draw call each, over every display region """
+    calls = 0
+    for region in app.win.getActiveDisplayRegions():
+        graph = region.makeCullResultGraph()
+        if graph is not None:
+            analyzer = SceneGraphAnalyzer()
+            analyzer.addNode(graph)
+            calls += analyzer.getNumGeoms()
+
+    return calls
+
+
+def sceneSize(app) -> Dict[str, int]:
+    """ Nodes, Geoms and vertices under render and aspect2d """
+    analyzer = SceneGraphAnalyzer()
+    analyzer.addNode(app.render.node())
+    analyzer.addNode(app.aspect2d.node())
+
+    return {
+        "nodes": analyzer.getNumNodes(),
+        "geoms": analyzer.getNumGeoms(),
+        "vertices": analyzer.getNumVertices()
+    }
+
+
+def startWorld(app, name: str):
+    if name == "sandbox":
+        app.startSandbox()
+        return app.sandbox
+
+    app.startTutorial()
+    world = app.tutorial1
+    world.levelStart()
+    return world
+
+
+def fly(app, name: str, frames: int, sample: int) -> Dict[str, list]:
+    """ Fly a world through its script for frames, returning the time of each frame and the samples """
+    world = startWorld(app, name)
+    events = [event for event in SCRIPTS[name] if event[0] < frames]
+
+    times = []
+    samples = {"frame": [], "drawCalls": [], "nodes": [], "geoms": [], "vertices": []}
+    for frame in range(frames):
+        while events and events[0][0] == frame:
+            _, key, held = events.pop(0)
+            app.keyMap[key] = held
+
+        begin = time.perf_counter()
+        app.taskMgr.step()
+        times.append(time.perf_counter() - begin)
+
+        if frame % sample == 0 or frame == frames - 1:
+            samples["frame"].append(frame)
+            samples["drawCalls"].append(drawCalls(app))
+            for key, value in sceneSize(app).items():
+                samples[key].append(value)
+
+    for _, key, _ in SCRIPTS[name]:
+        app.keyMap[key] = False
+    world.menu()
+
+    return {"times": times, "samples": samples}
+
+
+def summary(times: Sequence[float]) -> Dict[str, float]:
+    """ Frame time statistics, in the format of harness.bench so they can be compared """
+    ordered = sorted(times)
+    return {
+        "median": statistics.median(ordered),
+        "min": ordered[0],
+        "mean": statistics.mean(ordered),
+        "stdev": statistics.stdev(ordered) if len(ordered) > 1 else 0.0,
+        "p95": ordered[int(0.95 * (len(ordered) - 1))],
+        "max": ordered[-1],
+        "number": 1,
+        "repeat": len(ordered)
+    }
+
+
+def growth(samples: Dict[str, list], warmup: int) -> float:
+    """ Relative growth in scene graph nodes from the first sample after warmup to the last """
+    nodes = [n for frame, n in zip(samples["frame"], samples["nodes"]) if frame >= warmup] or samples["nodes"]
+    return (nodes[-1] - nodes[0]) / max(nodes[0], 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--world", choices=sorted(SCRIPTS), nargs="+", default=sorted(SCRIPTS),
+                        help="worlds to fly")
+    parser.add_argument("--frames", type=int, default=5000, help="frames to fly each world for")
+    parser.add_argument("--sample", type=int, default=100, help="frames between samples of the scene")
+    parser.add_argument("--warmup", type=int, default=1000,
+                        help="frames before the scene graph is expected to stop growing")
+    parser.add_argument("--max-growth", type=float, default=0.1,
+                        help="growth in scene graph nodes after the warmup counted as a regression")
+    parser.add_argument("--display", default="p3headlessgl",
+                        help="display module, p3headlessgl renders OpenGL in software through Mesa")
+    parser.add_argument("--size", type=int, nargs=2, default=(640, 360), help="size of the offscreen buffer")
+    parser.add_argument("--output", default=os.path.join(RESULTS, "render.json"),
+                        help="file to write the results to")
+    parser.add_argument("--baseline", default=os.path.join(RESULTS, "render-baseline.json"),
+                        help="baseline results to compare against or save to")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline, exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true", help="also save the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="slowdown relative to the baseline counted as a regression")
+    args = parser.parse_args(argv)
+
+    configure(args.display, tuple(args.size))
+    from main import MyApp
+    from src.game import World
+
+    # Benchmark flights are not the player's, keep them out of recordings/ and the ghosts
+    World.RECORD_FLIGHTS = False
+    app = MyApp()
+    # An offscreen buffer has no mouse, the camera controls read one which never has a button down
+    if app.mouseWatcherNode is None:
+        app.mouseWatcherNode = MouseWatcher()
+    globalClock.setMode(ClockObject.MNonRealTime)
+    globalClock.setFrameRate(FRAME_RATE)
+    print("Rendering with %s, %s" % (app.pipe.getType().getName(), app.win.getGsg().getDriverRenderer()))
+
+    results = {}
+    samples = {}
+    ok = True
+    for name in args.world:
+        run = fly(app, name, args.frames, args.sample)
+        results["render.%s.frame" % name] = summary(run["times"])
+        samples[name] = run["samples"]
+
+        s = run["samples"]
+        grown = growth(s, args.warmup)
+        print("%s: %d frames, median %.2f ms, p95 %.2f ms, %d-%d draw calls, nodes %d -> %d (%+.1f%% after warmup)" % (
+            name, args.frames, 1000 * results["render.%s.frame" % name]["median"],
+            1000 * results["render.%s.frame" % name]["p95"], min(s["drawCalls"]), max(s["drawCalls"]),
+            s["nodes"][0], s["nodes"][-1], 100 * grown))
+        if grown > args.max_growth:
+            print("%s: scene graph grew %.1f%% after warmup  REGRESSION" % (name, 100 * grown))
+            ok = False
+
+    app.destroy()
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        with open(path, "w") as f:
+            json.dump({"meta": metadata(), "results": results, "samples": samples}, f, indent=2, sort_keys=True)
+    print("Wrote results to %s" % args.output)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print("No baseline at %s" % args.baseline, file=sys.stderr)
+            return 1
+        ok = compare(results, load(args.baseline), args.tolerance) and ok
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Benchmarks for the simulation and scene hot paths.
+
+Runs headless, Panda3D is started without a window. Results are written as
+JSON and, given a baseline from an earlier run, compared against it. Run from
+the repository root.
+
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run --compare
+"""
+import argparse
+import os
+import sys
+import numpy as np
+from panda3d.core import loadPrcFileData, Filename, PandaNode
+
+from benchmarks.harness import bench, compare, load, save
+from src.curves import (frenet_serre, integrate_frenet_serre, propagate_frenet_serre, solve_frenet_serre,
+                        tangent_to_hpr, STEP)
+
+RESULTS = os.path.join(os.path.dirname(__file__), "results")
+
+P0 = (10, 40, 40)
+T0 = (0, 1, 0)
+N0 = (1, 0, 0)
+B0 = (0, 0, 1)
+KAPPA = 0.01
+TAU = 0.002
+
+
+def curveBenchmarks(results):
+    for ival in (1.5, 15, 150):
+        results["solve_frenet_serre[ival=%g]" % ival] = bench(
+            lambda: solve_frenet_serre(P0, T0, N0, B0, KAPPA, TAU, ival))
+
+    results["propagate_frenet_serre[step]"] = bench(
+        lambda: propagate_frenet_serre(P0, T0, N0, B0, KAPPA, TAU, STEP))
+    samples = np.arange(0, 150, STEP)
+    results["propagate_frenet_serre[ival=150]"] = bench(
+        lambda: propagate_frenet_serre(P0, T0, N0, B0, KAPPA, TAU, samples))
+
+    # Curvature and torsion varying along the curve, unit steps are as accurate as odeint
+    steps = np.arange(0, 151, 1.0)
+    results["integrate_frenet_serre[ival=150,h=1]"] = bench(
+        lambda: integrate_frenet_serre(P0, T0, N0, B0, lambda s: KAPPA * np.sin(0.1 * s), TAU, steps))
+
+    y = list(P0 + T0 + N0 + B0)
+    results["frenet_serre"] = bench(lambda: frenet_serre(y, 0, KAPPA, TAU))
+
+    results["tangent_to_hpr"] = bench(lambda: tangent_to_hpr((0.3, 0.8, 0.52), N0, B0))
+
+
+def ringBenchmarks(results):
+    from src.rings import RingSet, NEXT
+    from src.sim import Course, circleCourse
+
+    parent = PandaNode("rings")
+    course = Course.fromRings(circleCourse())
+
+    results["RingSet.draw[tutorial1]"] = bench(lambda: RingSet(course.transforms, parent), number=20)
+    parent.removeAllChildren()
+
+    rings = RingSet(course.transforms, parent)
+    results["RingSet.setColor"] = bench(lambda: (rings.setColor(0, NEXT), rings.reset()))
+
+    center, normal = course.centers[0], course.normals[0]
+    inside = (center - normal + (0, 0, 1), center + normal + (0, 0, 1))
+    outside = (center - normal + (0, 0, 20), center + normal + (0, 0, 20))
+    results["Course.crosses[inside]"] = bench(lambda: course.crosses(0, *inside))
+    results["Course.crosses[outside]"] = bench(lambda: course.crosses(0, *outside))
+
+
+def solverBenchmarks(results):
+    from src.sim import circleCourse
+    from src.sim.solver import solve
+
+    # The nine rings of Tutorial Level 1, including checking the schedule found by flying it
+    rings = circleCourse()
+    results["solve[tutorial1]"] = bench(lambda: solve(rings), repeat=3, number=1)
+
+
+def worldBenchmarks(results, frames):
+    """ Cost of a frame's tick and drawCurve once the sandbox has flown for each number of frames """
+    from main import MyApp
+    from src.game import World
+
+    # Benchmark flights are not the player's, keep them out of recordings/ and the ghosts
+    World.RECORD_FLIGHTS = False
+    app = None
+    try:
+        # The worlds are built on first use, loading their assets here
+        app = MyApp()
+        world = app.sandbox
+    except IOError as e:
+        print("Skipping world benchmarks, could not load the game assets: %s" % e, file=sys.stderr)
+        if app is not None:
+            app.destroy()
+        return
+
+    world.run()
+
+    # Fly a circle so the flight never ends
+    app.keyMap["curv+"] = True
+    for _ in range(int(KAPPA / world.SCALE)):
+        world.tick()
+    app.keyMap["curv+"] = False
+
+    done = 0
+    for checkpoint in sorted(frames):
+        for _ in range(max(checkpoint - done, 0)):
+            world.tick()
+            world.drawCurve()
+        done = checkpoint
+
+        results["World.tick[%d frames]" % checkpoint] = bench(world.tick, number=200)
+        results["World.drawCurve[%d frames]" % checkpoint] = bench(world.drawCurve, number=200)
+        done += 5 * 200
+
+    app.destroy()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=os.path.join(RESULTS, "latest.json"),
+                        help="file to write the results to")
+    parser.add_argument("--baseline", default=os.path.join(RESULTS, "baseline.json"),
+                        help="baseline results to compare against or save to")
+    parser.add_argument("--compare", action="store_true", help="compare against the baseline, exit 1 on regression")
+    parser.add_argument("--save-baseline", action="store_true", help="also save the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="slowdown relative to the baseline counted as a regression")
+    parser.add_argument("--frames", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="frames flown before timing World.drawCurve")
+    parser.add_argument("--skip-world", action="store_true", help="skip the benchmarks that need the game assets")
+    args = parser.parse_args(argv)
+
+    # Assets are loaded relative to the repository root rather than this script
+    loadPrcFileData("", "window-type none\naudio-library-name null\nmodel-path %s"
+                    % Filename.fromOsSpecific(os.getcwd()).getFullpath())
+
+    results = {}
+    curveBenchmarks(results)
+    ringBenchmarks(results)
+    solverBenchmarks(results)
+    if not args.skip_world:
+        worldBenchmarks(results, args.frames)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    save(args.output, results)
+    print("Wrote %d results to %s" % (len(results), args.output))
+
+    if args.save_baseline:
+        save(args.baseline, results)
+        print("Saved baseline to %s" % args.baseline)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print("No baseline at %s" % args.baseline, file=sys.stderr)
+            return 1
+        return 0 if compare(results, load(args.baseline), args.tolerance) else 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,23 @@
+import time
+
 from direct.showbase.ShowBase import ShowBase
-from panda3d.core import WindowProperties
+from panda3d.core import GraphicsWindow, WindowProperties
 
-from src.game import SandBox, TutorialLevel1
+from src.assets import assets
+from src.game import SandBox, TutorialLevel1, WORLD_ASSETS
 from src.menu import Menu
+from src.profiler import FrameProfiler
 
 
 class MyApp(ShowBase):
-    def __init__(self):
+    def __init__(self, startTime: float = None):
         ShowBase.__init__(self)
 
         self.props = WindowProperties()
-        self.sandbox = SandBox(self)
-        self.tutorial1 = TutorialLevel1(self)
+        self.profiler = FrameProfiler()
+        self._sandbox = None
+        self._tutorial1 = None
+        self.startTime = startTime if startTime is not None else time.perf_counter()
         self.menuObject = Menu(self)
         self.mouseX = 1920 / 2
         self.mouseY = 1080 / 2
@@ -42,9 +48,37 @@ class MyApp(ShowBase):
         self.accept("escape", self.updateKeyMap, ["esc", True])
         self.accept("escape-up", self.updateKeyMap, ["esc", False])
         self.accept("mouse1", self.setMousePos)
+        self.accept("f3", self.profiler.toggleOverlay)
+        self.accept("f4", self.exportProfile)
 
+        self.profiler.start()
         self.menu()
 
+        # The menu is interactive once its first frame has been rendered
+        taskMgr.add(self.menuReady, "menuReady", sort=100)
+
+    @property
+    def sandbox(self) -> SandBox:
+        """ The sandbox world, built the first time it is needed """
+        if self._sandbox is None:
+            self._sandbox = SandBox.build(self)
+        return self._sandbox
+
+    @property
+    def tutorial1(self) -> TutorialLevel1:
+        """ The first tutorial level, built the first time it is needed """
+        if self._tutorial1 is None:
+            self._tutorial1 = TutorialLevel1.build(self)
+        return self._tutorial1
+
+    def menuReady(self, task):
+        self.profiler.startupTime = time.perf_counter() - self.startTime
+
+        # Load what the worlds need while the player is in the menu
+        assets.preload(WORLD_ASSETS, self.menuObject.setLoadProgress)
+
+        return task.done
+
     def startSandbox(self):
         self.menuObject.clean()
         self.sandbox.start()
@@ -57,6 +91,10 @@ class MyApp(ShowBase):
         self.menuObject.showHome()
 
     def setWindowSize(self, x: int, y: int):
+        # Headless and offscreen runs have no window to resize
+        if not isinstance(self.win, GraphicsWindow):
+            return
+
         self.props.setSize(x, y)
         base.win.requestProperties(self.props)
 
@@ -69,10 +107,27 @@ class MyApp(ShowBase):
     def setCameraHpr(self, h, p, r):
         self.camera.setHpr(h, p, r)
 
+    def exportProfile(self):
+        path = self.profiler.export()
+        with open(path + ".assets.txt", "w") as f:
+            f.write(assets.report())
+        print("Profile written to %s.csv, .json and .assets.txt" % path)
+
+    def destroy(self):
+        """ Tear down the worlds which were built, releasing their assets, then the app """
+        for world in (self._sandbox, self._tutorial1):
+            if world is not None:
+                world.destroy()
+        self._sandbox = self._tutorial1 = None
+        super().destroy()
+
     def setMousePos(self):
         md = base.win.getPointer(0)
         self.mouseX = md.getX()
         self.mouseY = md.getY()
 
-app = MyApp()
-app.run()
\ No newline at end of file
+
+if __name__ == "__main__":
+    # Time to the first interactive menu is measured from before the app starts
+    app = MyApp(startTime=time.perf_counter())
+    app.run()
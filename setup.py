@@ -1,8 +1,41 @@
-from setuptools import setup
+from setuptools import setup, Command
+from direct.dist.commands import build_apps
+
+
+class build_assets(Command):
+    description = "compile models to BAM and textures to TXO, skipping unchanged assets"
+    user_options = [('force', 'f', "compile every asset even if it has not changed")]
+    boolean_options = ['force']
+
+    def initialize_options(self):
+        self.force = False
+
+    def finalize_options(self):
+        pass
+
+    def run(self):
+        from src.build import build, gameAssets
+
+        # Assets missing their sources are skipped, the game loads whatever was compiled before
+        counts = build(gameAssets(), force=self.force)
+        if counts["missing"]:
+            self.warn("%d assets are missing their source files and were not compiled" % counts["missing"])
+
+
+class build_apps_with_assets(build_apps):
+    """ Compile the assets before freezing, so the apps only ship the compiled versions """
+
+    def run(self):
+        self.run_command('build_assets')
+        super().run()
 
 
 setup(
     name='flight-sim',
+    cmdclass={
+        'build_assets': build_assets,
+        'build_apps': build_apps_with_assets,
+    },
     options={
         'build_apps': {
             'gui_apps': {
@@ -14,12 +47,16 @@ setup(
             'log_append': False,
 
             # Specify which files are included with the distribution
+            # Models, textures and UI images are shipped compiled, see src/build.py
             'include_patterns': [
-                'models/**',
-                'ui/**',
+                'compiled/**',
+                'models/terrain/*.gif',
                 'fonts/*.ttf',
                 'sounds/*.ogg'
             ],
+            'exclude_patterns': [
+                'compiled/manifest.json'
+            ],
 
             # Platforms that we're building for.
             'platforms': [
@@ -28,11 +65,11 @@ setup(
                 "macosx_10_6_x86_64",
             ],
 
-            # Include the OpenGL renderer and OpenAL audio plug-in
+            # Include the OpenGL renderer and OpenAL audio plug-in, models are
+            # compiled to BAM so the assimp plug-in is not needed
             'plugins': [
                 'pandagl',
-                'p3openal_audio',
-                'p3assimp'
+                'p3openal_audio'
             ],
 
             'include_modules': {'*': ['scipy._lib.messagestream', 'scipy.spatial.transform._rotation_groups']}
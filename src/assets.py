@@ -0,0 +1,233 @@
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from direct.task.TaskManagerGlobal import taskMgr
+from panda3d.core import Filename, FontPool, NodePath, SceneGraphAnalyzer, TexturePool, VirtualFileSystem
+
+from src.build import runtimePath
+from src.sim.course import Course
+
+# Shared UI assets
+FONT = "fonts/Wbxkomik.ttf"
+CLICK = "sounds/UIClick.ogg"
+FRAME = "ui/stoneFrame.png"
+BUTTON_IMAGES = (
+    "ui/UIButton.png",
+    "ui/UIButtonPressed.png",
+    "ui/UIButtonHighlighted.png",
+    "ui/UIButtonDisabled.png"
+)
+
+
+class Asset:
+    __slots__ = ("value", "refs", "size")
+
+    def __init__(self, value, size: int):
+        self.value = value
+        self.refs = 0
+        self.size = size
+
+
+class AssetRegistry:
+    """
+    Loads each model, texture, font and sound once per process and hands
+    out shared references to it. Every request counts as a reference and
+    `release` drops one, unloading the asset when none are left. Owners
+    such as a world collect the (kind, path) of everything they request
+    with `collect` and give it all back with `releaseAll`. Sizes are
+    estimates of the memory each asset holds, in bytes. Assets are keyed by
+    their source path but loaded from the compiled BAM, TXO or course when
+    one has been built, see `src.build`.
+
+    Assets can also be preloaded in the background, models with Panda3D's
+    asynchronous loader and textures on a worker thread, so they are ready
+    before anything asks for them.
+    """
+
+    def __init__(self):
+        self.assets: Dict[Tuple[str, str], Asset] = {}
+        self.pending = []
+        self.preloaded = 0
+        self.onProgress = None
+        self.executor = None
+        self.collecting: List[Tuple[str, str]] = None
+
+    def acquire(self, kind: str, path: str, load, measure):
+        key = (kind, path)
+        asset = self.assets.get(key)
+        if asset is None:
+            value = load(runtimePath(kind, path))
+            asset = self.assets[key] = Asset(value, measure(value, path))
+
+        asset.refs += 1
+        if self.collecting is not None:
+            self.collecting.append(key)
+        return asset.value
+
+    @contextmanager
+    def collect(self, refs: List[Tuple[str, str]]):
+        """ Append the (kind, path) of every asset acquired inside the block to refs """
+        previous, self.collecting = self.collecting, refs
+        try:
+            yield refs
+        finally:
+            self.collecting = previous
+
+    def release(self, kind: str, path: str):
+        key = (kind, path)
+        asset = self.assets.get(key)
+        if asset is None:
+            return
+
+        asset.refs -= 1
+        if asset.refs <= 0:
+            del self.assets[key]
+            if kind == "model":
+                loader.unloadModel(asset.value)
+            elif kind in ("texture", "cubeMap"):
+                loader.unloadTexture(asset.value)
+            elif kind == "sfx":
+                loader.unloadSfx(asset.value)
+            elif kind == "font":
+                FontPool.releaseFont(runtimePath(kind, path))
+
+    def releaseAll(self, refs: List[Tuple[str, str]]):
+        """ Release every reference collected in refs, emptying it """
+        for kind, path in refs:
+            self.release(kind, path)
+        refs.clear()
+
+    def model(self, path: str) -> NodePath:
+        """ Copy of the model, sharing its geometry with every other copy """
+        return self.acquire("model", path, loader.loadModel, modelSize).copyTo(NodePath())
+
+    def texture(self, path: str):
+        return self.acquire("texture", path, loader.loadTexture, textureSize)
+
+    def cubeMap(self, path: str):
+        return self.acquire("cubeMap", path, loadCubeMap, textureSize)
+
+    def font(self, path: str = FONT):
+        return self.acquire("font", path, loader.loadFont, fileSize)
+
+    def sfx(self, path: str = CLICK):
+        return self.acquire("sfx", path, loader.loadSfx, fileSize)
+
+    def course(self, path: str) -> Course:
+        """ Ring course of a JSON level, see `src.sim.course` """
+        return self.acquire("course", path, loadCourse, fileSize)
+
+    def preload(self, requests: Sequence[Tuple[str, str]], onProgress: Callable[[int, int], None] = None):
+        """
+        Load (kind, path) pairs in the background, kind being "model",
+        "texture" or "cubeMap". onProgress(done, total) is called on the main
+        thread as each asset arrives.
+        """
+        requests = [(kind, path) for kind, path in requests if (kind, path) not in self.assets]
+        self.onProgress = onProgress
+        self.preloaded = 0
+        self.pending = []
+        if not requests:
+            self.progress()
+            return
+
+        for kind, path in requests:
+            source = runtimePath(kind, path)
+            if kind == "model":
+                self.pending.append((kind, path, loader.loadModel(source, blocking=False)))
+            else:
+                if self.executor is None:
+                    self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="assets")
+                # A compiled cube map is a single TXO file which loads as any other texture
+                cubeMap = kind == "cubeMap" and source == path
+                load = TexturePool.loadCubeMap if cubeMap else TexturePool.loadTexture
+                self.pending.append((kind, path, self.executor.submit(load, source)))
+
+        self.progress()
+        taskMgr.add(self.pollPreload, "assetPreload")
+
+    def pollPreload(self, task):
+        """ Register the assets which have finished loading since the last frame """
+        waiting = []
+        for kind, path, request in self.pending:
+            if not request.done():
+                waiting.append((kind, path, request))
+                continue
+
+            value = request.result()
+            if (kind, path) not in self.assets and value is not None:
+                self.assets[(kind, path)] = Asset(value, MEASURE[kind](value, path))
+            self.preloaded += 1
+
+        self.pending = waiting
+        self.progress()
+
+        return task.cont if waiting else task.done
+
+    def progress(self):
+        if self.onProgress is not None:
+            self.onProgress(self.preloaded, self.preloaded + len(self.pending))
+
+    def buttonImages(self) -> tuple:
+        """ Ready, pressed, highlighted and disabled button textures """
+        return tuple(self.texture(path) for path in BUTTON_IMAGES)
+
+    def memoryUsage(self) -> Dict[str, int]:
+        """ Estimated bytes held by each kind of asset """
+        usage = {}
+        for (kind, path), asset in self.assets.items():
+            usage[kind] = usage.get(kind, 0) + asset.size
+
+        return usage
+
+    def report(self) -> str:
+        lines = ["%-8s %5s %10s  %s" % ("kind", "refs", "bytes", "path")]
+        for (kind, path), asset in sorted(self.assets.items()):
+            lines.append("%-8s %5d %10d  %s" % (kind, asset.refs, asset.size, path))
+        lines.append("total %d bytes" % sum(asset.size for asset in self.assets.values()))
+
+        return "\n".join(lines)
+
+
+def loadCubeMap(path: str):
+    """ Load a cube map from its six faces, or from a compiled TXO """
+    if path.endswith(".txo"):
+        return loader.loadTexture(path)
+    return loader.loadCubeMap(path)
+
+
+def loadCourse(path: str) -> Course:
+    """ Load a compiled course, or compile a level from its JSON source """
+    if path.endswith(".npz"):
+        # Read through the VFS, the path is a Panda path and may be inside a multifile
+        return Course.load(io.BytesIO(VirtualFileSystem.getGlobalPtr().readFile(Filename(path), True)))
+    return Course.fromLevel(path)
+
+
+def modelSize(model: NodePath, path: str) -> int:
+    analyzer = SceneGraphAnalyzer()
+    analyzer.addNode(model.node())
+
+    return analyzer.getVertexDataSize() + analyzer.getTextureBytes()
+
+
+def textureSize(texture, path: str) -> int:
+    return texture.estimateTextureMemory()
+
+
+def fileSize(value, path: str) -> int:
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+# Size estimate for each kind of preloaded asset
+MEASURE = {
+    "model": modelSize,
+    "texture": textureSize,
+    "cubeMap": textureSize
+}
+
+
+assets = AssetRegistry()
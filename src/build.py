@@ -0,0 +1,218 @@
+"""
+Compiles the game's models to BAM, its textures to TXO and its levels to
+courses so they load without parsing source formats, or the assimp plugin,
+at runtime. The terrain's heightfield is compiled to the ground flights
+crash into, which the headless tools in `src.sim` load with NumPy alone.
+
+Compiled files are written under `compiled/` mirroring the source paths. A
+manifest records a hash of each source, and of the Panda3D version, so
+assets which have not changed are skipped on the next build. Run from the
+repository root
+
+    python -m src.build
+    python -m src.build --force
+    python -m src.build --level levels/custom.json
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, List, Sequence, Tuple
+
+from panda3d.core import (Filename, Loader, LoaderOptions, NodePath, PandaSystem, TexturePool,
+                          VirtualFileSystem, getModelPath)
+
+from src.sim.course import Course
+from src.terrain import TERRAIN_HEIGHTFIELD, terrainGround
+
+COMPILED = "compiled"
+MANIFEST = os.path.join(COMPILED, "manifest.json")
+
+EXTENSIONS = {
+    "model": ".bam",
+    "texture": ".txo",
+    "cubeMap": ".txo",
+    "course": ".npz",
+    "ground": ".npz"
+}
+
+
+def compiledPath(kind: str, path: str) -> str:
+    """ Where the compiled version of an asset is written, relative to the repository root """
+    if kind not in EXTENSIONS:
+        return path
+
+    root, _ = os.path.splitext(path.replace("#", "cube"))
+    return "/".join((COMPILED, root + EXTENSIONS[kind]))
+
+
+def sourceFiles(kind: str, path: str) -> List[str]:
+    """ Files an asset is loaded from, the six faces for a cube map """
+    if kind == "cubeMap":
+        return sorted(glob.glob(path.replace("#", "[0-5]")))
+    return [path] if os.path.exists(path) else []
+
+
+def sourceHash(kind: str, path: str) -> str:
+    digest = hashlib.sha256(PandaSystem.getVersionString().encode())
+    for source in sourceFiles(kind, path):
+        with open(source, "rb") as f:
+            digest.update(f.read())
+
+    return digest.hexdigest()
+
+
+def resolve(path: str):
+    """ The file at path on the model path, or None """
+    filename = Filename(path)
+    if VirtualFileSystem.getGlobalPtr().resolveFilename(filename, getModelPath().getValue()):
+        return filename
+    return None
+
+
+def runtimePath(kind: str, path: str) -> str:
+    """
+    The compiled asset if one has been built and is at least as new as its
+    source, otherwise the source itself.
+    """
+    if kind not in EXTENSIONS:
+        return path
+
+    compiled = resolve(compiledPath(kind, path))
+    if compiled is None:
+        return path
+
+    # Any of a cube map's six faces may be newer than the rest
+    faces = [path.replace("#", str(face)) for face in range(6)] if "#" in path else [path]
+    sources = [source for source in map(resolve, faces) if source is not None]
+    vfs = VirtualFileSystem.getGlobalPtr()
+    if sources and max(vfs.getFile(source).getTimestamp() for source in sources) > \
+            vfs.getFile(compiled).getTimestamp():
+        return path
+
+    return compiled.getFullpath()
+
+
+def compileModel(path: str, output: str):
+    node = Loader.getGlobalPtr().loadSync(Filename(path), LoaderOptions(LoaderOptions.LF_no_cache))
+    if node is None:
+        raise IOError("Could not load model %s" % path)
+
+    # Merge the model's nodes and vertex data so it is drawn in as few batches as possible
+    model = NodePath(node)
+    model.flattenStrong()
+
+    # Compile the textures the model refers to as well, and refer to the compiled versions from the BAM
+    for texture in model.findAllTextures():
+        source = os.path.relpath(texture.getFullpath().toOsSpecific())
+        if source.startswith(os.pardir) or source.endswith(".txo"):
+            continue
+        compiled = compiledPath("texture", source.replace(os.sep, "/"))
+        os.makedirs(os.path.dirname(compiled), exist_ok=True)
+        writeTexture(texture, compiled)
+        texture.setFilename(Filename(compiled))
+        texture.setFullpath(Filename.fromOsSpecific(os.path.abspath(compiled)))
+
+    if not model.writeBamFile(Filename(output)):
+        raise IOError("Could not write %s" % output)
+
+
+def compileTexture(path: str, output: str, cubeMap: bool = False):
+    texture = TexturePool.loadCubeMap(path) if cubeMap else TexturePool.loadTexture(path)
+    if texture is None:
+        raise IOError("Could not load texture %s" % path)
+
+    writeTexture(texture, output)
+    TexturePool.releaseTexture(texture)
+
+
+def writeTexture(texture, output: str):
+    # Store the mipmap levels too, rather than generating them on every load
+    if texture.usesMipmaps():
+        texture.generateRamMipmapImages()
+    if not texture.write(Filename(output)):
+        raise IOError("Could not write %s" % output)
+
+
+def compileAsset(kind: str, path: str, output: str):
+    if kind == "model":
+        compileModel(path, output)
+    elif kind == "course":
+        Course.fromLevel(path).save(output)
+    elif kind == "ground":
+        terrainGround(path).save(output)
+    else:
+        compileTexture(path, output, cubeMap=kind == "cubeMap")
+
+
+def loadManifest() -> Dict[str, str]:
+    if not os.path.exists(MANIFEST):
+        return {}
+    with open(MANIFEST) as f:
+        return json.load(f)
+
+
+def saveManifest(manifest: Dict[str, str]):
+    with open(MANIFEST, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def gameAssets() -> List[Tuple[str, str]]:
+    """ Every model, texture and level the game loads, and the ground of its terrain """
+    from src.assets import BUTTON_IMAGES, FRAME
+    from src.game import LEVELS, WORLD_ASSETS
+
+    return list(WORLD_ASSETS) + [("course", path) for path in LEVELS] + \
+        [("texture", path) for path in BUTTON_IMAGES + (FRAME,)] + [("ground", TERRAIN_HEIGHTFIELD)]
+
+
+def build(requests: Sequence[Tuple[str, str]], force: bool = False) -> Dict[str, int]:
+    """
+    Compile each (kind, path) whose source has changed since the last
+    build, returning the number of assets compiled, skipped and missing.
+    """
+    manifest = loadManifest()
+    counts = {"compiled": 0, "skipped": 0, "missing": 0}
+
+    for kind, path in requests:
+        output = compiledPath(kind, path)
+        if not sourceFiles(kind, path):
+            print("missing  %s" % path, file=sys.stderr)
+            counts["missing"] += 1
+            continue
+
+        digest = sourceHash(kind, path)
+        if not force and manifest.get(output) == digest and os.path.exists(output):
+            counts["skipped"] += 1
+            continue
+
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+        compileAsset(kind, path, output)
+        manifest[output] = digest
+        counts["compiled"] += 1
+        print("compiled %s -> %s" % (path, output))
+
+    os.makedirs(COMPILED, exist_ok=True)
+    saveManifest(manifest)
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--force", action="store_true", help="compile every asset even if it has not changed")
+    parser.add_argument("--level", action="append", default=[],
+                        help="compile this JSON level instead of the game's assets, may be repeated")
+    args = parser.parse_args(argv)
+
+    requests = [("course", path) for path in args.level] if args.level else gameAssets()
+    counts = build(requests, force=args.force)
+    print("%(compiled)d compiled, %(skipped)d unchanged, %(missing)d missing" % counts)
+
+    return 1 if counts["missing"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
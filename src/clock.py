@@ -0,0 +1,63 @@
+from typing import Tuple
+
+
+class FixedTimestep:
+    """
+    Converts variable frame times into a whole number of fixed length
+    simulation ticks. Left over time is carried to the next frame and
+    exposed as `alpha`, the fraction of a tick the renderer should
+    interpolate between the previous and current simulation states.
+
+    When a frame is too slow to catch up in `maxTicks` ticks the extra time
+    is dropped, so the simulation slows down rather than spiralling.
+    """
+
+    def __init__(self, rate: float = 60, maxTicks: int = 5):
+        self.rate = rate
+        self.dt = 1 / rate
+        self.maxTicks = maxTicks
+
+        self.accumulator = 0.0
+        self.tick = 0
+        self.dropped = 0
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.tick = 0
+        self.dropped = 0
+
+    def advance(self, frameTime: float) -> int:
+        """ Add the frame time and return the number of ticks to simulate """
+        self.accumulator += max(frameTime, 0.0)
+
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.maxTicks:
+            self.dropped += ticks - self.maxTicks
+            self.accumulator -= (ticks - self.maxTicks) * self.dt
+            ticks = self.maxTicks
+
+        self.accumulator -= ticks * self.dt
+        self.tick += ticks
+
+        return ticks
+
+    @property
+    def alpha(self) -> float:
+        """ Fraction of the next tick elapsed, in [0, 1) """
+        return min(self.accumulator / self.dt, 1.0)
+
+
+def lerp(a, b, alpha: float) -> Tuple[float, float, float]:
+    """ Linear interpolation between the points a and b """
+    return (
+        a[0] + (b[0] - a[0]) * alpha,
+        a[1] + (b[1] - a[1]) * alpha,
+        a[2] + (b[2] - a[2]) * alpha
+    )
+
+
+def lerpHpr(a, b, alpha: float) -> Tuple[float, float, float]:
+    """ Interpolate heading, pitch and roll in degrees along the shortest way round """
+    return tuple(
+        x + ((y - x + 180) % 360 - 180) * alpha for x, y in zip(a, b)
+    )
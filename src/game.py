@@ -1,47 +1,85 @@
+import os
+import time
 from abc import ABC, abstractmethod
-from math import pi
 from direct.gui.DirectGui import *
 from direct.task.TaskManagerGlobal import taskMgr
-from panda3d.core import GeoMipTerrain, TextureStage, TexGenAttrib, PointLight, LineSegs, NodePath, PandaNode, \
-    TextNode
+from panda3d.core import TextureStage, TexGenAttrib, PointLight, NodePath, PandaNode
 from pandac.PandaModules import MouseButton
-from src.curves import solve_frenet_serre, tangent_to_hpr
+
+from src.assets import assets, CLICK, FONT, FRAME
+from src.clock import FixedTimestep, lerp, lerpHpr
+from src.curves import tangent_to_hpr
+from src.ghosts import GhostFleet, bestRuns
+from src.hud import HUD
+from src.lookahead import LookaheadCache
 from src.plane import Plane
-from src.rings import TorusCircle
+from src.rings import RingSet, NEXT, PASSED
+from src.sim import Flight, START, FLYING, CRASHED, commandFromKeyMap
+from src.sim.recorder import FlightRecorder, prune
+from src.terrain import TERRAIN_HEIGHTFIELD, TerrainManager, imageHeights, tiled, tiledGround
+from src.trail import TrailLine
+
+
+SKYSPHERE = "models/skysphere/InvertedSphere.egg"
+SKYBOX = "models/skybox/skybox_#.jpg"
+TERRAIN_TEXTURE = "models/terrain/grid2.jpg"
+
+# Levels, compiled to courses by src/build.py, see src/sim/course.py
+TUTORIAL1_LEVEL = "levels/tutorial1.json"
+LEVELS = [TUTORIAL1_LEVEL]
+
+# Directory every flight is recorded to, see src/sim/recorder.py
+RECORDINGS = "recordings"
+
+# Assets every world loads, which can be preloaded while the menu is shown
+WORLD_ASSETS = [("model", SKYSPHERE), ("cubeMap", SKYBOX), ("texture", TERRAIN_TEXTURE)] + Plane.ASSETS
 
 
 class World(ABC):
     INTERVAL = 150
     SCALE = 0.001
+    TRAIL_LENGTH = 5000
+    LOOKAHEAD_CACHE_SIZE = 128
+    TICK_RATE = 60
+    MAX_TICKS_PER_FRAME = 5
+    HUD_RATE = 10
+    TERRAIN_RADIUS = 3
+    TERRAIN_MAX_CHUNKS = 64
+    RECORD_FLIGHTS = True
+    KEYFRAME_INTERVAL = 600
+    # Recordings kept of each world, the most recent and the fastest completed, at least as many as ghosts shown
+    RECORDINGS_KEPT = 10
+    FASTEST_KEPT = 32
 
     def __init__(self, parent):
         self.parent = parent
-        self.font = loader.loadFont("fonts/Wbxkomik.ttf")
+        self.assetRefs = []
+        self.font = assets.font(FONT)
 
-        # Create Terrain
-        self.terrain = NodePath(PandaNode("terrain"))
-        self.terrainGenerate()
+        # Create Terrain, the same heights are used for collisions
+        heights = imageHeights(TERRAIN_HEIGHTFIELD)
+        self.terrain = TerrainManager(tiled(heights), assets.texture(TERRAIN_TEXTURE),
+                                      radius=self.TERRAIN_RADIUS, maxChunks=self.TERRAIN_MAX_CHUNKS)
+        # Start building the chunks around the start on the worker, drawModels waits for the one under it
+        self.terrain.update(START)
+        self.ground = tiledGround(heights, self.terrain.chunkSize, self.terrain.heightScale)
 
         # Skybox
-        self.sphere = loader.loadModel("models/skysphere/InvertedSphere.egg")
+        self.sphere = assets.model(SKYSPHERE)
         self.skyboxGenerate()
 
         # Plane
         self.plane = Plane()
 
-        # Text Nodes
-        self.text = ['Pos', 'Tangent', 'Normal', 'Binormal', 'kappa', 'tau']
-        self.textObject = [TextNode(string) for string in self.text]
-
-        self.nodeHUD = PandaNode("HUD")
-        self.npHUD = NodePath(self.nodeHUD)
-
-        for i, node in enumerate(self.textObject):
-            np = NodePath(node)
-            np.setPos(-1.7, 0, -0.4 - i / 10)
-            np.setScale(0.07)
-            self.nodeHUD.addChild(node)
-            node.setTextColor(0, 0, 0, 1)
+        # HUD
+        self.hud = HUD(self.HUD_RATE)
+        self.hud.add("Plane Pos", self.plane.getPos, "(%.2f, %.2f, %.2f)")
+        self.hud.add("Tangent", self.plane.getT, "(%.2f, %.2f, %.2f)")
+        self.hud.add("Normal", self.plane.getN, "(%.2f, %.2f, %.2f)")
+        self.hud.add("Binormal", self.plane.getB, "(%.2f, %.2f, %.2f)")
+        self.hud.add("Curvature", lambda: self.plane.kappa, "%.4f")
+        self.hud.add("Torsion", lambda: self.plane.tau, "%.4f")
+        self.hud.add("FPS", globalClock.getAverageFrameRate, "%.0f")
 
         # Floater for camera
         self.floater = NodePath(PandaNode("floater"))
@@ -56,38 +94,51 @@ class World(ABC):
         self.prevtime = 0
         self.hpr = (180, 90, 0)
 
+        # Simulation clock, the plane is drawn between the previous and current tick
+        self.clock = FixedTimestep(self.TICK_RATE, self.MAX_TICKS_PER_FRAME)
+        self.prevPos = self.prevHpr = self.simHpr = None
+        self.flight = None
+        self.recorder = None
+        self.course = ()
+
         # Curve
-        self.line = LineSegs()
-        self.line.setThickness(4)
-        self.prev_line = LineSegs()
-        self.prev_line.setThickness(4)
+        self.lookahead = LookaheadCache(self.INTERVAL, self.SCALE, self.LOOKAHEAD_CACHE_SIZE, color=(1, 1, 0, 1))
+        self.impact = -1
+        self.trail = TrailLine('trail', self.TRAIL_LENGTH, color=(1, 1, 1, 1))
 
         self.curves = PandaNode('Curve')
         self.lineAhead = PandaNode('lineAhead')
         self.lineBehind = PandaNode('lineBehind')
         NodePath(self.lineAhead).reparentTo(NodePath(self.curves))
         NodePath(self.lineBehind).reparentTo(NodePath(self.curves))
+        self.lookahead.node.reparentTo(NodePath(self.lineAhead))
+        self.trail.node.reparentTo(NodePath(self.lineBehind))
 
         # Lighting
         plight = PointLight('plight')
         plight.setColor((1, 1, 1, 1))
-        plnp = render.attachNewNode(plight)
-        plnp.setPos(200, 200, 200)
-        render.setLight(plnp)
+        self.light = render.attachNewNode(plight)
+        self.light.setPos(200, 200, 200)
+        render.setLight(self.light)
 
-        self.buttonImages = (
-            loader.loadTexture("ui/UIButton.png"),
-            loader.loadTexture("ui/UIButtonPressed.png"),
-            loader.loadTexture("ui/UIButtonHighlighted.png"),
-            loader.loadTexture("ui/UIButtonDisabled.png")
-        )
+        self.buttonImages = assets.buttonImages()
 
         self.gameOverScreen = DirectDialog(frameSize=(-0.7, 0.7, -0.7, 0.7),
                                            fadeScreen=0.4,
                                            relief=DGG.FLAT,
-                                           frameTexture="ui/stoneFrame.png")
+                                           frameTexture=assets.texture(FRAME))
         self.gameoverScreenGenerate()
 
+    @classmethod
+    def build(cls, parent) -> "World":
+        """ Build the world, recording the assets it acquires so destroy can release them """
+        refs = []
+        with assets.collect(refs):
+            world = cls(parent)
+        world.assetRefs.extend(refs)
+
+        return world
+
     @abstractmethod
     def start(self):
         """ Run the program """
@@ -96,7 +147,8 @@ class World(ABC):
     def drawModels(self):
         """ Draw all models and initialise cameras"""
         self.parent.setWindowSize(1920, 1080)
-        self.terrain.reparentTo(render)
+        self.terrain.load(START)
+        self.terrain.node.reparentTo(render)
         self.sphere.reparentTo(render)
         self.plane.model.reparentTo(render)
         NodePath(self.curves).reparentTo(render)
@@ -104,12 +156,18 @@ class World(ABC):
     def startUpdaters(self):
         """ Add tasks to task manager """
         self.run()
-        self.npHUD.reparentTo(aspect2d)
+        self.hud.refresh()
+        self.hud.node.reparentTo(aspect2d)
+
+        self.addTask(self.updateCollisionDetection, "updateCol")
+        self.addTask(self.updateCurvTor, "updatePos")
+        self.addTask(self.updateHUD, "updateHUD")
+        self.addTask(self.updateCamera, "updateCam")
+        self.addTask(self.updateTerrain, "updateTerrain")
 
-        taskMgr.add(self.updateCollisionDetection, "updateCol")
-        taskMgr.add(self.updateCurvTor, "updatePos")
-        taskMgr.add(self.updateHUD, "updateHUD")
-        taskMgr.add(self.updateCamera, "updateCam")
+    def addTask(self, func, name: str):
+        """ Add a task to the task manager, timed by the app's profiler """
+        taskMgr.add(self.parent.profiler.wrap(name, func), name)
 
     def run(self):
         """ Reset variables to rerun the program """
@@ -120,11 +178,16 @@ class World(ABC):
         self.prevtime = 0
 
         # Initialise Plane
-        self.plane.start(p0=(10, 40, 40))
+        self.plane.start(p0=START)
+        self.flight = Flight(self.plane.state, self.course, scale=self.SCALE, ground=self.ground)
+        self.startRecording()
+        self.clock.reset()
+        self.simHpr = self.prevHpr = tangent_to_hpr(self.plane.getT(), self.plane.getN(), self.plane.getB())
+        self.prevPos = self.plane.getPos()
 
         # Clear Lines
-        self.lineAhead.removeAllChildren()
-        self.lineBehind.removeAllChildren()
+        self.lookahead.clear()
+        self.trail.clear()
 
     @staticmethod
     def stopUpdaters():
@@ -133,40 +196,62 @@ class World(ABC):
         taskMgr.remove("updatePos")
         taskMgr.remove("updateHUD")
         taskMgr.remove("updateCam")
+        taskMgr.remove("updateTerrain")
 
     def clean(self):
         self.gameOverScreen.hide()
-        self.npHUD.detachNode()
-        self.terrain.detachNode()
+        self.hud.node.detachNode()
+        self.terrain.node.detachNode()
         self.sphere.detachNode()
         self.plane.model.detachNode()
         NodePath(self.curves).detachNode()
 
         self.stopUpdaters()
+        self.stopRecording()
+
+    def destroy(self):
+        """ Tear the world down, releasing every asset it acquired """
+        self.clean()
+        self.gameOverScreen.destroy()
+        self.hud.node.removeNode()
+        self.terrain.destroy()
+        self.sphere.removeNode()
+        self.plane.model.removeNode()
+        NodePath(self.curves).removeNode()
+        render.clearLight(self.light)
+        self.light.removeNode()
+        assets.releaseAll(self.assetRefs)
+
+    def recordingPrefix(self) -> str:
+        return type(self).__name__.lower()
+
+    def startRecording(self):
+        """ Record the new flight, closing the recording of the last """
+        self.stopRecording()
+        if not self.RECORD_FLIGHTS:
+            return
+
+        os.makedirs(RECORDINGS, exist_ok=True)
+        path = os.path.join(RECORDINGS, "%s-%s-%03d.rec" % (self.recordingPrefix(),
+                                                           time.strftime("%Y%m%d-%H%M%S"),
+                                                           int(time.time() * 1000) % 1000))
+        self.recorder = FlightRecorder(path, self.flight, self.KEYFRAME_INTERVAL)
+
+    def stopRecording(self):
+        """ Close the recording, keeping only the most recent and fastest of this world's recordings """
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+            prune(RECORDINGS, self.recordingPrefix(), self.RECORDINGS_KEPT, self.FASTEST_KEPT)
 
     def menu(self):
         self.clean()
         self.parent.menu()
 
-    def terrainGenerate(self):
-        """ Generate Terrain """
-        texture = loader.loadTexture('models/terrain/grid2.jpg')
-        size = 2
-        scale = 1
-
-        for i in range(-size, size):
-            for j in range(-size, size):
-                x, y = 256 * i * scale, 256 * j * scale
-                terrain = GeoMipTerrain("mySimpleTerrain")
-                terrainRoot = terrain.getRoot()
-                terrainRoot.reparentTo(self.terrain)
-                terrain.setHeightfield("models/terrain/black.gif")
-                terrainRoot.setTexture(texture)
-
-                terrainRoot.setSx(scale)
-                terrainRoot.setSy(scale)
-                terrainRoot.setPos(x, y, 0)
-                terrain.generate()
+    def updateTerrain(self, task):
+        """ Page the terrain around the plane """
+        self.terrain.update(self.plane.getPos())
+        return task.cont
 
     def skyboxGenerate(self):
         # Load a sphere with a radius of 1 unit and the faces directed inward.
@@ -175,42 +260,30 @@ class World(ABC):
         self.sphere.setTexPos(TextureStage.getDefault(), 0, 0, 0)
         self.sphere.setTexScale(TextureStage.getDefault(), .5)
 
-        tex = loader.loadCubeMap("models/skybox/skybox_#.jpg")
+        tex = assets.cubeMap(SKYBOX)
         self.sphere.setTexture(tex)
         self.sphere.setLightOff()
         self.sphere.setScale(1000)
         self.sphere.setHpr(0, -90, 0)
 
     def updateCurvTor(self, task):
-        """ Movement bases on curvature and torsion """
-        if self.parent.keyMap["tor+"]:
-            self.plane.tau += self.SCALE
-        if self.parent.keyMap["tor-"]:
-            self.plane.tau -= self.SCALE
-        if self.parent.keyMap["curv+"]:
-            self.plane.kappa += self.SCALE
-        if self.parent.keyMap["curv-"]:
-            self.plane.kappa -= self.SCALE
-        if self.parent.keyMap["curv0"]:
-            self.plane.kappa = 0
-        if self.parent.keyMap["tor0"]:
-            self.plane.tau = 0
+        """ Run the simulation ticks due this frame and draw the plane between the last two """
         if self.parent.keyMap["esc"]:
             self.menu()
+            return task.done
 
-        sol = solve_frenet_serre(self.plane.getPos(), self.plane.getT(), self.plane.getN(), self.plane.getB(),
-                                 self.plane.kappa, self.plane.tau, self.INTERVAL)
+        for _ in range(self.clock.advance(globalClock.getDt())):
+            self.prevPos = self.plane.getPos()
+            self.prevHpr = self.simHpr
+            self.tick()
 
-        self.drawCurve(sol[:, 0], sol[:, 1], sol[:, 2])
+        alpha = self.clock.alpha
+        self.plane.setModelPos(lerp(self.prevPos, self.plane.getPos(), alpha))
+        hpr = lerpHpr(self.prevHpr, self.simHpr, alpha)
+        self.plane.setHpr(hpr)
 
-        index = 1
-        self.plane.setPos(sol[index, 0], sol[index, 1], sol[index, 2])
-        self.plane.setT(sol[index, 3], sol[index, 4], sol[index, 5])
-        self.plane.setN(sol[index, 6], sol[index, 7], sol[index, 8])
-        self.plane.setB(sol[index, 9], sol[index, 10], sol[index, 11])
+        self.drawCurve()
 
-        hpr = tangent_to_hpr(self.plane.getT(), self.plane.getN(), self.plane.getB())
-        self.plane.setHpr(hpr)
         self.x += hpr[0] - self.hpr[0]
         self.y += self.hpr[1] - hpr[1]
         self.hpr = hpr
@@ -219,56 +292,59 @@ class World(ABC):
 
         return task.cont
 
-    def camPos(self, scale):
-        x = self.plane.getPos()[0] - scale * self.plane.getT()[0]
-        y = self.plane.getPos()[1] - scale * self.plane.getT()[1]
-        z = self.plane.getPos()[2] - scale * self.plane.getT()[2] + 10
-
-        self.parent.setCameraPos(x, y, z)
+    def tick(self):
+        """ Step the flight with the controls held down, movement is based on curvature and torsion """
+        if self.flight.state.status != FLYING:
+            return
 
-    def updateHUD(self, task):
-        pos_str = "Plane Pos: " + self.strVector(self.plane.getPos())
-        tanjent_str = "Tangent: " + self.strVector(self.plane.getT())
-        normal_str = "Normal: " + self.strVector(self.plane.getN())
-        binormal_str = "Binormal: " + self.strVector(self.plane.getB())
-        kappa_str = "Curvature: " + str(round(self.plane.kappa, 4))
-        tau_str = "Torsion: " + str(round(self.plane.tau, 4))
-
-        self.textObject[0].setText(pos_str)
-        self.textObject[1].setText(tanjent_str)
-        self.textObject[2].setText(normal_str)
-        self.textObject[3].setText(binormal_str)
-        self.textObject[4].setText(kappa_str)
-        self.textObject[5].setText(tau_str)
+        if len(self.trail) == 0:
+            self.trail.append(self.plane.getPos())
 
-        return task.cont
+        command = commandFromKeyMap(self.parent.keyMap)
+        events = self.flight.step(command)
+        self.trail.append(self.plane.getPos())
 
-    def drawCurve(self, x, y, z):
-        self.lineAhead.removeAllChildren()
+        if self.recorder is not None:
+            self.recorder.record(command, events)
+            if self.flight.state.status != FLYING:
+                self.stopRecording()
 
-        self.prev_line.moveTo(x[0], y[0], z[0])
-        self.prev_line.drawTo(x[1], y[1], z[1])
+        self.simHpr = tangent_to_hpr(self.plane.getT(), self.plane.getN(), self.plane.getB())
 
-        for i in range(len(x) - 1):
-            self.line.drawTo(x[i + 1], y[i + 1], z[i + 1])
+    def camPos(self, scale):
+        pos = self.plane.model.getPos()
+        x = pos[0] - scale * self.plane.getT()[0]
+        y = pos[1] - scale * self.plane.getT()[1]
+        z = pos[2] - scale * self.plane.getT()[2] + 10
 
-        NodePath(self.line.create()).reparentTo(NodePath(self.lineAhead))
+        self.parent.setCameraPos(x, y, z)
 
-        for i in range(len(x) - 1):
-            self.line.setVertexColor(i, 255, 255, 0, 1)
+    def updateHUD(self, task):
+        self.hud.update(task.time)
+        return task.cont
 
-        NodePath(self.prev_line.create()).reparentTo(NodePath(self.lineBehind))
+    def drawCurve(self):
+        """ Place the lookahead curve at the plane, the trail is extended each tick """
+        if self.flight.state.status != FLYING:
+            self.lookahead.clear()
+            return
 
-    def updateCollisionDetection(self, task):
-        plane_x, plane_y, plane_z = self.plane.getPos()
+        self.lookahead.show(self.plane.kappa, self.plane.tau, self.plane.getPos(),
+                            self.plane.getT(), self.plane.getN(), self.plane.getB())
 
-        if plane_z <= 0:
-            self.plane.setT(0, 0, 0)
-            self.plane.setN(0, 0, 0)
-            self.plane.setB(0, 0, 0)
+        # Turn the curve red while it runs into the ground
+        impact = self.ground.firstImpact(self.lookahead.points())
+        if (impact >= 0) != (self.impact >= 0):
+            if impact >= 0:
+                self.lookahead.node.setColorScale(1, 0, 0, 1)
+            else:
+                self.lookahead.node.clearColorScale()
+        self.impact = impact
 
-            if self.gameOverScreen.isHidden():
-                self.gameOverScreen.show()
+    def updateCollisionDetection(self, task):
+        """ Show the game over screen once the flight has crashed """
+        if self.flight.state.status == CRASHED and self.gameOverScreen.isHidden():
+            self.gameOverScreen.show()
 
         return task.cont
 
@@ -286,13 +362,6 @@ class World(ABC):
         self.prevtime = task.time
         return task.cont
 
-    @staticmethod
-    def strVector(vector):
-        digits = 2
-
-        return "(" + str(round(vector[0], digits)) + ", " + str(round(vector[1], digits)) \
-            + ", " + str(round(vector[2], digits)) + ")"
-
     def gameoverScreenGenerate(self):
         self.gameOverScreen.hide()
 
@@ -309,7 +378,7 @@ class World(ABC):
                            parent=self.gameOverScreen,
                            scale=0.07,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -323,7 +392,7 @@ class World(ABC):
                            parent=self.gameOverScreen,
                            scale=0.07,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -348,19 +417,24 @@ class Tutorial(World, ABC):
         self.titleScreen = DirectDialog(frameSize=(-0.7, 0.7, -0.7, 0.7),
                                         fadeScreen=0.4,
                                         relief=DGG.FLAT,
-                                        frameTexture="ui/stoneFrame.png")
+                                        frameTexture=assets.texture(FRAME))
         self.title = self.desc = self.titleBtn = None
         self.titleScreenGenerate()
 
         self.levelCompleteScreen = DirectDialog(frameSize=(-0.7, 0.7, -0.7, 0.7),
                                                 fadeScreen=0.4,
                                                 relief=DGG.FLAT,
-                                                frameTexture="ui/stoneFrame.png")
+                                                frameTexture=assets.texture(FRAME))
         self.levelCompleteScreenGenerate()
 
         self.levelLineNode = PandaNode('levelLineNode')
         NodePath(self.levelLineNode).reparentTo(NodePath(self.curves))
 
+    def destroy(self):
+        super().destroy()
+        self.titleScreen.destroy()
+        self.levelCompleteScreen.destroy()
+
     @abstractmethod
     def levelStart(self):
         pass
@@ -396,7 +470,7 @@ class Tutorial(World, ABC):
                                      parent=self.titleScreen,
                                      scale=0.07,
                                      text_font=self.font,
-                                     clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                                     clickSound=assets.sfx(CLICK),
                                      frameTexture=self.buttonImages,
                                      frameSize=(-4, 4, -1, 1),
                                      text_scale=0.75,
@@ -410,7 +484,7 @@ class Tutorial(World, ABC):
                            parent=self.titleScreen,
                            scale=0.07,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -434,7 +508,7 @@ class Tutorial(World, ABC):
                            parent=self.levelCompleteScreen,
                            scale=0.07,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -448,7 +522,7 @@ class Tutorial(World, ABC):
                            parent=self.levelCompleteScreen,
                            scale=0.07,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -458,15 +532,20 @@ class Tutorial(World, ABC):
 
 
 class TutorialLevel1(Tutorial):
+    MAX_GHOSTS = 32
+
     def __init__(self, parent):
         super().__init__(parent)
         self.ring = None
-        self.ringLines = []
+        self.rings = None
+        self.ghosts = None
+        self.level = assets.course(TUTORIAL1_LEVEL)
+        self.hud.add("Rings", lambda: (self.flight.state.ring, len(self.course)), "%d/%d")
 
     def start(self):
         self.drawModels()
-        self.title.setText("Level 1: Circles")
-        self.desc.setText("Set a positive curvature to make a circle")
+        self.title.setText(self.level.name)
+        self.desc.setText(self.level.description)
         self.titleScreen.show()
 
     def run(self):
@@ -474,14 +553,17 @@ class TutorialLevel1(Tutorial):
 
         self.ring = 0
 
-        self.ringLines[0].setColor(1)
-        for ring in self.ringLines[1:]:
-            ring.setColor(0)
+        self.rings.reset()
+        self.rings.setColor(0, NEXT)
 
     def clean(self):
         self.titleScreen.hide()
         self.levelCompleteScreen.hide()
         self.levelLineNode.removeAllChildren()
+        taskMgr.remove("ghosts")
+        if self.ghosts is not None:
+            self.ghosts.destroy()
+            self.ghosts = None
         super().clean()
 
     def levelStart(self):
@@ -490,40 +572,42 @@ class TutorialLevel1(Tutorial):
 
         # Draw Circles + Color them
         self.drawCircles()
+        # Ghosts of the fastest previous runs, before this one starts recording
+        self.ghosts = GhostFleet(bestRuns(RECORDINGS, self.recordingPrefix(), self.MAX_GHOSTS))
+        self.ghosts.node.reparentTo(render)
         # Start Game Updaters
-        taskMgr.add(self.updateLevel, "level")
+        self.addTask(self.updateLevel, "level")
+        self.addTask(self.updateGhosts, "ghosts")
         self.startUpdaters()
 
+    def updateGhosts(self, task):
+        """ Fly the ghosts in step with the plane, which is drawn between the last two ticks """
+        self.ghosts.update(max(self.flight.state.tick - 1, 0), self.clock.alpha)
+        return task.cont
+
     def updateLevel(self, task):
-        if self.ringLines[self.ring].isInsideRing(self.plane.getPos()):
-            self.ringLines[self.ring].setColor(2)
+        """ Color the rings the flight has passed since the last frame """
+        while self.ring < self.flight.state.ring:
+            self.rings.setColor(self.ring, PASSED)
             self.ring += 1
 
             # Check if all rings have been completed
-            if self.ring == len(self.ringLines):
+            if self.ring == len(self.rings):
                 taskMgr.remove("level")
                 self.levelComplete()
-            else:
-                self.ringLines[self.ring].setColor(1)
+                return task.done
+
+            self.rings.setColor(self.ring, NEXT)
 
         return task.cont
 
     def drawCircles(self):
-        outerCenter, outerRadius = (110, 110, 40), 100
-        numSegs = 12
-
-        angles = [pi - 2 * pi * i / numSegs for i in range(numSegs - 3)]
-
-        innerRadius = 10
-        self.ringLines = [TorusCircle(theta, innerRadius, outerCenter, outerRadius, self.levelLineNode) for theta in
-                          angles]
-        self.ringLines[0].setColor(1)
+        self.course = self.level
+        self.rings = RingSet(self.course.transforms, self.levelLineNode)
+        self.rings.setColor(0, NEXT)
         self.ring = 0
 
     def levelComplete(self):
-        self.plane.setT(0, 0, 0)
-        self.plane.setN(0, 0, 0)
-        self.plane.setB(0, 0, 0)
         self.levelCompleteScreen.show()
 
     def nextLevel(self):
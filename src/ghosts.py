@@ -0,0 +1,204 @@
+from typing import List, Sequence, Tuple
+
+import numpy as np
+from panda3d.core import GeomEnums, LMatrix4f, NodePath, OmniBoundingVolume, Shader, Texture, TextureStage, \
+    TransparencyAttrib
+
+from src.assets import assets
+from src.plane import Plane
+from src.rings import supportsInstancing
+from src.sim.recorder import FlightLog, fastest, recordings
+
+GHOST_VERTEX = """
+#version 150
+
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform samplerBuffer ghostMatrices;
+
+in vec4 p3d_Vertex;
+in vec2 p3d_MultiTexCoord0;
+
+out vec2 texcoord;
+
+void main() {
+    // Each instance's transform is four texels, the rows of a Panda3D matrix
+    int base = gl_InstanceID * 4;
+    mat4 transform = mat4(texelFetch(ghostMatrices, base),
+                          texelFetch(ghostMatrices, base + 1),
+                          texelFetch(ghostMatrices, base + 2),
+                          texelFetch(ghostMatrices, base + 3));
+
+    gl_Position = p3d_ModelViewProjectionMatrix * transform * p3d_Vertex;
+    texcoord = p3d_MultiTexCoord0;
+}
+"""
+
+GHOST_FRAGMENT = """
+#version 150
+
+uniform sampler2D p3d_Texture0;
+uniform vec4 ghostColor;
+
+in vec2 texcoord;
+
+out vec4 color;
+
+void main() {
+    color = texture(p3d_Texture0, texcoord) * ghostColor;
+}
+"""
+
+
+def bestRuns(directory: str, prefix: str, count: int) -> List[FlightLog]:
+    """
+    The count completed recordings named prefix-... which took the fewest
+    ticks, ranked by the final state in their footers so only those shown
+    are opened
+    """
+    return [FlightLog(path) for path in fastest(recordings(directory, prefix), count)]
+
+
+def hprMatrices(tangents: np.ndarray) -> np.ndarray:
+    """
+    Rotation matrices, in Panda3D's row vector convention, of the heading
+    and pitch tangent_to_hpr gives the plane for each row of tangents.
+    """
+    tx, ty, tz = tangents[:, 0], tangents[:, 1], tangents[:, 2]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        h = np.where(tx == 0, np.pi, np.arctan(ty / tx) + np.where(tx > 0, np.pi / 2, -np.pi / 2))
+    p = np.pi / 2 - np.arctan(tz)
+
+    ch, sh = np.cos(h), np.sin(h)
+    cp, sp = np.cos(p), np.sin(p)
+
+    # Pitch about x then heading about z, with no roll
+    m = np.empty((len(tangents), 3, 3))
+    m[:, 0, 0] = ch
+    m[:, 0, 1] = sh
+    m[:, 0, 2] = 0
+    m[:, 1, 0] = -cp * sh
+    m[:, 1, 1] = cp * ch
+    m[:, 1, 2] = sp
+    m[:, 2, 0] = sp * sh
+    m[:, 2, 1] = -sp * ch
+    m[:, 2, 2] = cp
+
+    return m
+
+
+class GhostFleet:
+    """
+    Previously recorded flights drawn as translucent planes. Every ghost is
+    an instance of one copy of the plane model, placed by a shader from a
+    buffer texture of per instance transforms, so the scene graph, draw
+    calls and Python work per frame do not grow with the number of ghosts.
+
+    Ghost trajectories are streamed from their memory mapped recordings
+    `window` ticks at a time into one array, which each frame is indexed
+    for every ghost at once.
+
+    Renderers without GLSL 1.50 or buffer textures draw each ghost as its
+    own instance of the model instead, placed by its node's transform.
+    """
+
+    def __init__(self, logs: Sequence[FlightLog], window: int = 256,
+                 color: Tuple[float, float, float, float] = (1, 1, 1, 0.4)):
+        self.logs: List[FlightLog] = list(logs)
+        self.window = window
+        self.count = len(self.logs)
+
+        # Position and tangent of each ghost for ticks [base, base + window]
+        self.base = None
+        self.buffer = np.zeros((self.count, window + 1, 6))
+        self.ends = np.array([len(log) for log in self.logs], dtype=np.int64)
+
+        self.assetRefs = []
+        with assets.collect(self.assetRefs):
+            model = assets.model(Plane.MODEL)
+            model.setTexture(TextureStage('ts'), assets.texture(Plane.DIFFUSE))
+
+        self.instanced = supportsInstancing()
+        if not self.instanced:
+            self.node = NodePath("ghosts")
+            self.node.setColorScale(color)
+            self.node.setTransparency(TransparencyAttrib.M_alpha)
+            self.node.setDepthWrite(False)
+            self.ghosts = [self.node.attachNewNode("ghost") for _ in range(self.count)]
+            for ghost in self.ghosts:
+                model.instanceTo(ghost)
+            return
+
+        self.matrices = Texture("ghostMatrices")
+        self.matrices.setupBufferTexture(max(self.count, 1) * 4, Texture.T_float, Texture.F_rgba32,
+                                         GeomEnums.UH_dynamic)
+        self.matrices.setClearColor((0, 0, 0, 0))
+
+        self.node = model
+        self.node.setShader(Shader.make(Shader.SL_GLSL, GHOST_VERTEX, GHOST_FRAGMENT))
+        self.node.setShaderInput("ghostMatrices", self.matrices)
+        self.node.setShaderInput("ghostColor", color)
+        self.node.setTransparency(TransparencyAttrib.M_alpha)
+        self.node.setDepthWrite(False)
+        self.node.setInstanceCount(self.count)
+
+        # Instances are placed by the shader, so the model's own bounds mean nothing
+        self.node.node().setBounds(OmniBoundingVolume())
+        self.node.node().setFinal(True)
+
+        # An instance count of zero draws the model once, uninstanced
+        if not self.count:
+            self.node.hide()
+
+    def stream(self, base: int):
+        """ Read ticks [base, base + window] of every recording into the buffer """
+        self.base = base
+        for i, log in enumerate(self.logs):
+            # records[k] is the state after tick k + 1, tick 0 is the start state
+            start, stop = max(base - 1, 0), min(base + self.window, len(log))
+            rows = np.asarray(log.records["y"][start:stop, 0:6], dtype=np.float64)
+
+            offset = 0
+            if base == 0:
+                self.buffer[i, 0] = log.start().y[0:6]
+                offset = 1
+            self.buffer[i, offset:offset + len(rows)] = rows
+            if offset + len(rows) <= self.window:
+                # Past the end of the recording, the ghost is hidden
+                self.buffer[i, offset + len(rows):] = self.buffer[i, offset + len(rows) - 1]
+
+    def update(self, tick: int, alpha: float = 0.0):
+        """ Place every ghost where it was between tick and tick + 1 of its flight """
+        if not self.count:
+            return
+
+        if self.base is None or tick < self.base or tick + 1 > self.base + self.window:
+            self.stream(tick)
+
+        k = tick - self.base
+        a = self.buffer[:, k]
+        b = self.buffer[:, k + 1]
+        pos = a[:, 0:3] + (b[:, 0:3] - a[:, 0:3]) * alpha
+        tangent = a[:, 3:6] + (b[:, 3:6] - a[:, 3:6]) * alpha
+
+        matrices = np.zeros((self.count, 4, 4), dtype=np.float32)
+        matrices[:, 0:3, 0:3] = hprMatrices(tangent)
+        matrices[:, 3, 0:3] = pos
+        matrices[:, 3, 3] = 1
+
+        if not self.instanced:
+            for ghost, matrix, ended in zip(self.ghosts, matrices, tick > self.ends):
+                if ended:
+                    ghost.hide()
+                else:
+                    ghost.show()
+                    ghost.setMat(LMatrix4f(*matrix.ravel().tolist()))
+            return
+
+        # Ghosts whose flights have ended collapse to nothing
+        matrices[tick > self.ends] = 0
+
+        np.frombuffer(self.matrices.modifyRamImage(), dtype=np.float32)[:] = matrices.ravel()
+
+    def destroy(self):
+        self.node.removeNode()
+        assets.releaseAll(self.assetRefs)
@@ -0,0 +1,72 @@
+from typing import Callable, List, Tuple
+
+from panda3d.core import NodePath, PandaNode, TextNode
+
+
+class Readout:
+    """ A labelled value on the HUD, formatted with `fmt` which sets the precision shown """
+    __slots__ = ("label", "value", "fmt", "node", "text")
+
+    def __init__(self, label: str, value: Callable[[], object], fmt: str, node: TextNode):
+        self.label = label
+        self.value = value
+        self.fmt = fmt
+        self.node = node
+        self.text = None
+
+    def update(self) -> bool:
+        """ Regenerate the text if the value has changed at the precision shown """
+        text = self.label + ": " + self.fmt % self.value()
+        if text == self.text:
+            return False
+
+        self.text = text
+        self.node.setText(text)
+        return True
+
+
+class HUD:
+    """
+    A column of text readouts refreshed at most `rate` times a second. A
+    readout's TextNode is only regenerated when its formatted text changes,
+    so readouts which hold steady cost a string format per refresh and
+    nothing on the frames between refreshes.
+    """
+
+    def __init__(self, rate: float = 10, pos: Tuple[float, float] = (-1.7, -0.4), spacing: float = 0.1,
+                 scale: float = 0.07, color: Tuple[float, float, float, float] = (0, 0, 0, 1)):
+        self.interval = 1 / rate
+        self.pos = pos
+        self.spacing = spacing
+        self.scale = scale
+        self.color = color
+
+        self.node = NodePath(PandaNode("HUD"))
+        self.readouts: List[Readout] = []
+        self.last = None
+
+    def add(self, label: str, value: Callable[[], object], fmt: str = "%.2f") -> Readout:
+        """ Add a readout below the others, value is called on each refresh """
+        text = TextNode(label)
+        text.setTextColor(self.color)
+
+        np = self.node.attachNewNode(text)
+        np.setPos(self.pos[0], 0, self.pos[1] - len(self.readouts) * self.spacing)
+        np.setScale(self.scale)
+
+        readout = Readout(label, value, fmt, text)
+        self.readouts.append(readout)
+
+        return readout
+
+    def update(self, time: float) -> int:
+        """ Refresh the readouts if one is due, returning the number regenerated """
+        if self.last is not None and time - self.last < self.interval:
+            return 0
+
+        self.last = time
+        return sum(readout.update() for readout in self.readouts)
+
+    def refresh(self):
+        """ Refresh on the next update, whenever the last was """
+        self.last = None
@@ -0,0 +1,115 @@
+from collections import OrderedDict, namedtuple
+from typing import Tuple
+
+import numpy as np
+from panda3d.core import LMatrix4f, NodePath, PandaNode
+
+from src.curves import adaptive_samples, propagate_frenet_serre, CHORD_TOLERANCE
+from src.trail import CurveLine
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+Curve = namedtuple("Curve", ["node", "points"])
+
+
+class LookaheadCache:
+    """
+    Lookahead curves drawn in the plane's local frame, x = T, y = N, z = B,
+    where the curve only depends on the curvature and torsion. Curves are
+    cached by (kappa, tau) rounded to multiples of `quantum` and placed in
+    the world with the transform of the plane's current frame, evicting the
+    least recently used curve once `maxsize` curves are held. Each curve is
+    sampled as sparsely as its curvature allows while keeping within
+    `tolerance` of the true curve.
+    """
+
+    def __init__(self, interval: float, quantum: float, maxsize: int = 128,
+                 color: Tuple[float, float, float, float] = (1, 1, 0, 1), tolerance: float = CHORD_TOLERANCE):
+        self.interval = interval
+        self.quantum = quantum
+        self.maxsize = maxsize
+        self.color = color
+        self.tolerance = tolerance
+
+        self.curves = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        self.node = NodePath(PandaNode('lookahead'))
+        self.current = None
+        self.frame = None
+
+    def key(self, kappa: float, tau: float) -> Tuple[int, int]:
+        return round(kappa / self.quantum), round(tau / self.quantum)
+
+    def entry(self, kappa: float, tau: float) -> Curve:
+        """ Node and local frame points of the curve for the given curvature and torsion """
+        key = self.key(kappa, tau)
+
+        curve = self.curves.get(key)
+        if curve is not None:
+            self.hits += 1
+            self.curves.move_to_end(key)
+            return curve
+
+        self.misses += 1
+        kappa, tau = key[0] * self.quantum, key[1] * self.quantum
+        samples = adaptive_samples(kappa, self.interval, self.tolerance)
+        sol = propagate_frenet_serre((0, 0, 0), (1, 0, 0), (0, 1, 0), (0, 0, 1), kappa, tau, samples)
+        line = CurveLine('lookahead %d %d' % key, len(samples), color=self.color)
+        line.setPoints(sol[:, :3])
+        self.curves[key] = curve = Curve(line.node, np.ascontiguousarray(sol[:, :3]))
+
+        if len(self.curves) > self.maxsize:
+            _, evicted = self.curves.popitem(last=False)
+            if evicted is self.current:
+                self.current = None
+            evicted.node.removeNode()
+
+        return curve
+
+    def get(self, kappa: float, tau: float) -> NodePath:
+        """ Node of the local frame curve for the given curvature and torsion """
+        return self.entry(kappa, tau).node
+
+    def points(self) -> np.ndarray:
+        """ Points of the curve being shown in world coordinates, or None """
+        if self.current is None:
+            return None
+
+        tangent, normal, binormal, pos = self.frame
+        return self.current.points @ np.array((tangent, normal, binormal), dtype=np.float64) + pos
+
+    def show(self, kappa: float, tau: float,
+             pos: Tuple[float, float, float],
+             tangent: Tuple[float, float, float],
+             normal: Tuple[float, float, float],
+             binormal: Tuple[float, float, float]):
+        """ Show the curve for kappa and tau starting at pos with the given frame """
+        if not any(tangent):
+            # The frame is zeroed once the plane has stopped
+            self.clear()
+            return
+
+        curve = self.entry(kappa, tau)
+        if curve is not self.current:
+            if self.current is not None:
+                self.current.node.detachNode()
+            curve.node.reparentTo(self.node)
+            self.current = curve
+
+        self.frame = (tangent, normal, binormal, pos)
+        self.node.setMat(LMatrix4f(
+            tangent[0], tangent[1], tangent[2], 0,
+            normal[0], normal[1], normal[2], 0,
+            binormal[0], binormal[1], binormal[2], 0,
+            pos[0], pos[1], pos[2], 1
+        ))
+
+    def clear(self):
+        """ Hide the curve, keeping the cache """
+        if self.current is not None:
+            self.current.node.detachNode()
+            self.current = None
+
+    def cacheInfo(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.curves))
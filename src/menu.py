@@ -1,19 +1,16 @@
 from direct.gui.DirectGui import *
 from panda3d.core import TextNode, PandaNode, NodePath
 
+from src.assets import assets, CLICK, FONT
+
 
 class Menu:
     def __init__(self, parent):
-        self.font = loader.loadFont("fonts/Wbxkomik.ttf")
+        self.font = assets.font(FONT)
         self.parent = parent
 
         # Start Screen
-        self.buttonImages = (
-            loader.loadTexture("ui/UIButton.png"),
-            loader.loadTexture("ui/UIButtonPressed.png"),
-            loader.loadTexture("ui/UIButtonHighlighted.png"),
-            loader.loadTexture("ui/UIButtonDisabled.png")
-        )
+        self.buttonImages = assets.buttonImages()
 
         self.titleMenuBackdrop = DirectFrame(frameColor=(0, 0, 0, 1),
                                              frameSize=(-1, 1, -1, 1),
@@ -32,6 +29,19 @@ class Menu:
         self.controlScreenButton.hide()
         self.controlNodes = []
 
+        self.loadingBar = DirectWaitBar(text="Loading",
+                                        value=0,
+                                        range=1,
+                                        pos=(0, 0, -0.85),
+                                        scale=0.4,
+                                        parent=self.homeScreen,
+                                        text_font=self.font,
+                                        text_scale=0.1,
+                                        text_pos=(0, -0.2),
+                                        text_fg=(1, 1, 1, 1),
+                                        barColor=(1, 1, 1, 1))
+        self.loadingBar.hide()
+
         self.titleScreenCreate()
         self.controlScreenCreate()
 
@@ -44,6 +54,17 @@ class Menu:
         self.titleMenu.show()
         self.titleMenuBackdrop.show()
 
+    def setLoadProgress(self, done: int, total: int):
+        """ Show how many of the assets being loaded in the background have arrived """
+        if done >= total:
+            self.loadingBar.hide()
+            return
+
+        self.loadingBar["range"] = total
+        self.loadingBar["value"] = done
+        self.loadingBar["text"] = "Loading %d/%d" % (done, total)
+        self.loadingBar.show()
+
     def clean(self):
         """ Remove the main home screen from view"""
         self.homeScreen.hide()
@@ -62,7 +83,7 @@ class Menu:
                            parent=self.homeScreen,
                            scale=0.1,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -76,7 +97,7 @@ class Menu:
                            parent=self.homeScreen,
                            scale=0.1,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -90,7 +111,7 @@ class Menu:
                            parent=self.homeScreen,
                            scale=0.1,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -104,7 +125,7 @@ class Menu:
                            parent=self.homeScreen,
                            scale=0.1,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -119,7 +140,9 @@ class Menu:
             "A + D: Curvature",
             "Q: Set Curvature to 0",
             "E: Set Torsion to 0",
-            "Esc: Return to Menu"
+            "Esc: Return to Menu",
+            "F3: Performance Overlay",
+            "F4: Export Performance Profile"
         ]
 
         for i, string in enumerate(controls):
@@ -139,7 +162,7 @@ class Menu:
                            parent=self.controlScreenButton,
                            scale=0.1,
                            text_font=self.font,
-                           clickSound=loader.loadSfx("sounds/UIClick.ogg"),
+                           clickSound=assets.sfx(CLICK),
                            frameTexture=self.buttonImages,
                            frameSize=(-4, 4, -1, 1),
                            text_scale=0.75,
@@ -1,22 +1,27 @@
 from panda3d.core import TextureStage
 from typing import Tuple
 
+from src.assets import assets
+from src.sim import FlightState
+
 
 class Plane:
+    MODEL = "models/plane/piper_pa18.obj"
+    DIFFUSE = "models/plane/textures/piper_diffuse.jpg"
+    BUMP = "models/plane/textures/piper_bump.jpg"
+    REFLECTION = "models/plane/textures/piper_refl.jpg"
+    ASSETS = [("model", MODEL), ("texture", DIFFUSE), ("texture", BUMP), ("texture", REFLECTION)]
+
     def __init__(self):
 
         self.time = None
-        self.tau = None
-        self.kappa = None
-        self.plane_T = None
-        self.plane_N = None
-        self.plane_B = None
+        self.state = None
 
-        self.model = loader.loadModel("models/plane/piper_pa18.obj")
+        self.model = assets.model(self.MODEL)
         planeTS = TextureStage('ts')
-        planeDiffuse = loader.loadTexture("models/plane/textures/piper_diffuse.jpg")
-        planeBump = loader.loadTexture("models/plane/textures/piper_bump.jpg")
-        planeRefl = loader.loadTexture("models/plane/textures/piper_refl.jpg")
+        planeDiffuse = assets.texture(self.DIFFUSE)
+        planeBump = assets.texture(self.BUMP)
+        planeRefl = assets.texture(self.REFLECTION)
         self.model.setTexture(planeTS, planeDiffuse)
 
     def start(self, p0: Tuple[float, float, float],
@@ -27,35 +32,51 @@ class Plane:
         self.model.setPos(p0[0], p0[1], p0[2])
         self.model.setHpr(0, 90, 0)
         self.time = 0
-        self.tau = 0
-        self.kappa = 0
-        self.plane_T = tangent
-        self.plane_N = normal
-        self.plane_B = binormal
+        self.state = FlightState.start(p0, tangent, normal, binormal)
+
+    @property
+    def kappa(self) -> float:
+        return self.state.kappa
+
+    @kappa.setter
+    def kappa(self, kappa: float):
+        self.state.kappa = kappa
+
+    @property
+    def tau(self) -> float:
+        return self.state.tau
+
+    @tau.setter
+    def tau(self, tau: float):
+        self.state.tau = tau
 
     def getT(self) -> Tuple[float, float, float]:
-        return self.plane_T
+        return tuple(self.state.T)
 
     def setT(self, tx: float, ty: float, tz: float):
-        self.plane_T = (tx, ty, tz)
+        self.state.T[:] = (tx, ty, tz)
 
     def getN(self) -> Tuple[float, float, float]:
-        return self.plane_N
+        return tuple(self.state.N)
 
     def setN(self, nx: float, ny: float, nz: float):
-        self.plane_N = (nx, ny, nz)
+        self.state.N[:] = (nx, ny, nz)
 
     def getB(self) -> Tuple[float, float, float]:
-        return self.plane_B
+        return tuple(self.state.B)
 
     def setB(self, bx: float, by: float, bz: float):
-        self.plane_B = (bx, by, bz)
+        self.state.B[:] = (bx, by, bz)
 
     def setPos(self, x: float, y: float, z: float):
-        self.model.setPos(x, y, z)
+        """ Set the simulated position, the model is moved by setModelPos """
+        self.state.pos[:] = (x, y, z)
 
     def getPos(self) -> Tuple[float, float, float]:
-        return self.model.getPos()
+        return tuple(self.state.pos)
+
+    def setModelPos(self, pos: Tuple[float, float, float]):
+        self.model.setPos(pos[0], pos[1], pos[2])
 
     def setHpr(self, hpr: Tuple[float, float, float]):
         self.model.setHpr(hpr[0], hpr[1], hpr[2])
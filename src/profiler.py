@@ -0,0 +1,164 @@
+import csv
+import json
+import os
+import time
+from array import array
+from typing import Callable, Dict
+
+import numpy as np
+from direct.task.TaskManagerGlobal import taskMgr
+from panda3d.core import NodePath, SceneGraphAnalyzer, TextNode
+
+
+class FrameProfiler:
+    """
+    Records the wall time of every frame and of each task wrapped with
+    `wrap`, plus the number of nodes and vertices under render every
+    `sceneInterval` frames. Columns are kept for the whole session so they
+    can be exported, and a summary can be shown as an overlay. The app sets
+    `startupTime`, the seconds until its menu was interactive.
+    """
+    PERCENTILES = (50, 95, 99)
+
+    def __init__(self, sceneInterval: int = 60, overlayInterval: float = 0.25, window: int = 600):
+        self.sceneInterval = sceneInterval
+        self.overlayInterval = overlayInterval
+        self.window = window
+
+        self.frames = 0
+        self.frameTimes = array('d')
+        self.taskTimes: Dict[str, array] = {}
+        self.current: Dict[str, float] = {}
+        self.nodes = array('l')
+        self.vertices = array('l')
+        self.lastFrame = None
+        self.startupTime = None
+
+        self.overlayText = TextNode('profiler')
+        self.overlayText.setTextColor(0, 0, 0, 1)
+        self.overlayText.setAlign(TextNode.ARight)
+        self.overlay = NodePath(self.overlayText)
+        self.overlay.setScale(0.05)
+        self.overlay.setPos(-0.05, 0, -0.1)
+        self.overlayTime = 0
+
+    def start(self):
+        """ Record frames, after the frame has been rendered """
+        self.lastFrame = time.perf_counter()
+        taskMgr.add(self.frame, "profilerFrame", sort=100)
+
+    def stop(self):
+        taskMgr.remove("profilerFrame")
+        self.hideOverlay()
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        """ Task function which calls func and records its wall time under name """
+        if name not in self.taskTimes:
+            self.taskTimes[name] = array('d', bytes(8 * self.frames))
+            self.current[name] = 0.0
+
+        def timed(task):
+            t = time.perf_counter()
+            result = func(task)
+            self.current[name] += time.perf_counter() - t
+            return result
+
+        return timed
+
+    def frame(self, task):
+        now = time.perf_counter()
+        self.frameTimes.append(now - self.lastFrame)
+        self.lastFrame = now
+
+        for name, times in self.taskTimes.items():
+            times.append(self.current[name])
+            self.current[name] = 0.0
+
+        if self.frames % self.sceneInterval == 0:
+            analyzer = SceneGraphAnalyzer()
+            analyzer.addNode(render.node())
+            self.nodes.append(analyzer.getNumNodes())
+            self.vertices.append(analyzer.getNumVertices())
+        else:
+            self.nodes.append(self.nodes[-1])
+            self.vertices.append(self.vertices[-1])
+        self.frames += 1
+
+        if self.overlay.hasParent() and now - self.overlayTime >= self.overlayInterval:
+            self.overlayTime = now
+            self.overlayText.setText(self.summaryText())
+
+        return task.cont
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """ Percentiles in milliseconds of the frame and task times over the last `window` frames """
+        columns = {"frame": self.frameTimes}
+        columns.update(self.taskTimes)
+
+        stats = {}
+        for name, times in columns.items():
+            recent = np.frombuffer(times, dtype=np.float64)[-self.window:] * 1000
+            if len(recent) == 0:
+                continue
+            stats[name] = {"mean": float(recent.mean())}
+            for p, value in zip(self.PERCENTILES, np.percentile(recent, self.PERCENTILES)):
+                stats[name]["p%d" % p] = float(value)
+
+        return stats
+
+    def summaryText(self) -> str:
+        lines = []
+        if self.startupTime is not None:
+            lines.append("startup: %.3f s" % self.startupTime)
+        for name, stats in self.summary().items():
+            lines.append("%s: %.2f ms (p50 %.2f, p95 %.2f, p99 %.2f)"
+                         % (name, stats["mean"], stats["p50"], stats["p95"], stats["p99"]))
+        if self.frames:
+            lines.append("nodes: %d, vertices: %d" % (self.nodes[-1], self.vertices[-1]))
+
+        return "\n".join(lines)
+
+    def showOverlay(self):
+        self.overlay.reparentTo(base.a2dTopRight)
+        self.overlayTime = 0
+
+    def hideOverlay(self):
+        self.overlay.detachNode()
+
+    def toggleOverlay(self):
+        if not self.overlay.hasParent():
+            self.showOverlay()
+        else:
+            self.hideOverlay()
+
+    def exportCSV(self, path: str):
+        """ Write one row per frame, times in milliseconds """
+        names = list(self.taskTimes)
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame", "frame_ms"] + [name + "_ms" for name in names] + ["nodes", "vertices"])
+            for i in range(self.frames):
+                writer.writerow([i, self.frameTimes[i] * 1000] + [self.taskTimes[name][i] * 1000 for name in names]
+                                + [self.nodes[i], self.vertices[i]])
+
+    def exportJSON(self, path: str):
+        """ Write the summary and the per frame columns, times in milliseconds """
+        with open(path, "w") as f:
+            json.dump({
+                "frames": self.frames,
+                "startup_s": self.startupTime,
+                "summary": self.summary(),
+                "frame_ms": [t * 1000 for t in self.frameTimes],
+                "tasks_ms": {name: [t * 1000 for t in times] for name, times in self.taskTimes.items()},
+                "nodes": list(self.nodes),
+                "vertices": list(self.vertices)
+            }, f)
+
+    def export(self, directory: str = "profiles") -> str:
+        """ Export the session as CSV and JSON with a timestamped name, returning the path without extension """
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, time.strftime("session-%Y%m%d-%H%M%S"))
+        self.exportCSV(path + ".csv")
+        self.exportJSON(path + ".json")
+
+        return path
@@ -1,97 +1,208 @@
-from math import cos, pi, sin, fabs
-from typing import Tuple
+from math import pi
 
 import numpy as np
-from panda3d.core import LineSegs, NodePath
+from panda3d.core import Geom, GeomEnums, GeomNode, GeomTriangles, GeomVertexData, GeomVertexFormat, LMatrix4f, \
+    NodePath, OmniBoundingVolume, Shader, Texture
 
+# Number of segments around each ring, and around its tube
+RING_SEGMENTS = 128
+RING_SIDES = 8
 
-def unitVector(x, y):
-    """ Unit vector of x - y """
-    z = (
-        x[0] - y[0],
-        x[1] - y[1],
-        x[2] - y[2],
-    )
+# Radius of the tube a ring is drawn as, relative to the ring's radius
+RING_TUBE = 0.06
 
-    zHat = (z[0] ** 2 + z[1] ** 2 + z[2] ** 2) ** 0.5
+# Ring states
+IDLE = 0
+NEXT = 1
+PASSED = 2
+
+# Color of a ring in each state
+RING_COLORS = {
+    IDLE: (1, 1, 1, 1),
+    NEXT: (1, 1, 0, 1),
+    PASSED: (0, 1, 0, 1)
+}
 
-    return z[0] / zHat, z[1] / zHat, z[2] / zHat
-
-
-def rotateVector(pos, center, theta):
-    """ Rotate pos by theta radians about center """
-    x = pos[0] - center[0]
-    y = pos[1] - center[1]
-
-    rotX = cos(theta) * x - sin(theta) * y
-    rotY = sin(theta) * x + cos(theta) * y
-
-    return rotX + center[0], rotY + center[1], center[2]
-
-
-class TorusCircle:
-    """ Create a circle which is a slice of a Torus using LineSegs """
-
-    def __init__(self, theta: float, r1: float, c2: Tuple[float, float, float],
-                 r2: float, parent):
-        self.line = LineSegs()
-        self.ring = None
-        self.parent = parent
-        self.line.setThickness(20)
-        self.v = theta
-        self.radius = r1
-        self.outerCenter = c2
-        self.outerRadius = r2
-
-        self.draw()
-
-    def draw(self):
-        """ Torus Map: x(u,v)=((r cosu + a)cosv,(r cosu + a)sinv, r sinu) """
-        for u in np.arange(0, 2 * pi + 0.2, 0.05):
-            next_pos = (
-                (self.radius * cos(u) + self.outerRadius) * cos(self.v),
-                (self.radius * cos(u) + self.outerRadius) * sin(self.v),
-                self.radius * sin(u)
-            )
-            self.line.drawTo(next_pos[0] + self.outerCenter[0],
-                             next_pos[1] + self.outerCenter[1],
-                             next_pos[2] + self.outerCenter[2])
-
-        self.ring = self.line.create()
-        NodePath(self.ring).reparentTo(NodePath(self.parent))
-
-    def isInsideRing(self, pos: Tuple[float, float, float]):
-        """ Check if the point pos is contained in the interior of the ring """
-        dirVec = unitVector(pos, self.outerCenter)
-        ringVec = (cos(self.v), sin(self.v))
-
-        # Check if the angle to the centre point is the same
-        if fabs(dirVec[0] - ringVec[0]) > 0.01 or fabs(dirVec[1] - ringVec[1]) > 0.01:
-            return False
-
-        # Rotate pos
-        rotVec = rotateVector(pos, self.outerCenter, -self.v)
-
-        x = rotVec[0] - (self.outerCenter[0] + self.outerRadius)
-        z = rotVec[2] - self.outerCenter[2]
-
-        return (x ** 2 + z ** 2) <= self.radius ** 2
-
-    def setColor(self, num: int):
+RING_VERTEX = """
+#version 150
+
+uniform mat4 p3d_ModelViewProjectionMatrix;
+uniform samplerBuffer ringMatrices;
+uniform samplerBuffer ringColors;
+
+in vec4 p3d_Vertex;
+
+flat out vec4 ringColor;
+
+void main() {
+    // Each instance's transform is four texels, the rows of a Panda3D matrix
+    int base = gl_InstanceID * 4;
+    mat4 transform = mat4(texelFetch(ringMatrices, base),
+                          texelFetch(ringMatrices, base + 1),
+                          texelFetch(ringMatrices, base + 2),
+                          texelFetch(ringMatrices, base + 3));
+
+    gl_Position = p3d_ModelViewProjectionMatrix * transform * p3d_Vertex;
+    ringColor = texelFetch(ringColors, gl_InstanceID);
+}
+"""
+
+RING_FRAGMENT = """
+#version 150
+
+flat in vec4 ringColor;
+
+out vec4 color;
+
+void main() {
+    color = ringColor;
+}
+"""
+
+_template = None
+
+
+def ringTemplate() -> NodePath:
+    """
+    Thin torus around the unit circle in the xz plane, built once and drawn
+    for every ring. Rings are tubes of triangles rather than wide lines,
+    which core profile OpenGL and some renderers do not draw.
+    """
+    global _template
+    if _template is None:
+        u = np.linspace(0, 2 * pi, RING_SEGMENTS + 1)[:, None]
+        v = np.linspace(0, 2 * pi, RING_SIDES + 1)[None, :]
+        r = 1 + RING_TUBE * np.cos(v)
+        points = np.stack(np.broadcast_arrays(r * np.cos(u), RING_TUBE * np.sin(v), r * np.sin(u)), axis=-1)
+
+        vdata = GeomVertexData('ring', GeomVertexFormat.getV3(), Geom.UHStatic)
+        vdata.setNumRows(points.size // 3)
+        view = np.frombuffer(memoryview(vdata.modifyArray(0)).cast('B'), dtype=np.float32)
+        view[:] = points.ravel()
+
+        # Two triangles for each quad between neighbouring segments and sides
+        a = np.arange(RING_SEGMENTS)[:, None] * (RING_SIDES + 1) + np.arange(RING_SIDES)[None, :]
+        b = a + RING_SIDES + 1
+        quads = np.stack((a, b, a + 1, a + 1, b, b + 1), axis=-1)
+
+        triangles = GeomTriangles(Geom.UHStatic)
+        triangles.setIndexType(Geom.NT_uint16)
+        indices = triangles.modifyVertices()
+        indices.setNumRows(quads.size)
+        np.frombuffer(memoryview(indices).cast('B'), dtype=np.uint16)[:] = quads.ravel()
+
+        geom = Geom(vdata)
+        geom.addPrimitive(triangles)
+        node = GeomNode('ring')
+        node.addGeom(geom)
+
+        _template = NodePath(node)
+
+    return _template
+
+
+def supportsInstancing() -> bool:
+    """ Whether the window can run the instancing shaders, GLSL 1.50 with buffer textures """
+    gsg = base.win.getGsg() if base.win is not None else None
+    return gsg is not None and gsg.getSupportsGlsl() and gsg.getSupportsBufferTexture() and \
+        gsg.getSupportsGeometryInstancing() and \
+        (gsg.getDriverShaderVersionMajor(), gsg.getDriverShaderVersionMinor()) >= (1, 50)
+
+
+def bufferTexture(name: str, data: np.ndarray, usage) -> Texture:
+    """ Buffer texture of float RGBA texels holding data, at least one texel long """
+    texture = Texture(name)
+    texture.setupBufferTexture(max(data.size // 4, 1), Texture.T_float, Texture.F_rgba32, usage)
+    texture.setClearColor((0, 0, 0, 0))
+    if data.size:
+        np.frombuffer(texture.modifyRamImage(), dtype=np.float32)[:] = data.ravel()
+
+    return texture
+
+
+class RingSet:
+    """
+    Every ring of a course drawn in a single draw call. The template ring
+    is drawn once per ring with hardware instancing, a shader placing each
+    instance by its transform, taking the unit circle onto the ring in
+    Panda3D's row vector convention, and coloring it by its state, both
+    read from buffer textures. Changing a ring's state rewrites its texel of
+    the color buffer.
+
+    Renderers without GLSL 1.50 or buffer textures, such as tinydisplay or
+    the OpenGL 2.1 context of macOS, draw each ring as its own node holding
+    an instance of the template, colored by a color attribute.
+    """
+
+    def __init__(self, matrices: np.ndarray, parent):
+        matrices = np.asarray(matrices, dtype=np.float32).reshape(-1, 4, 4)
+        self.count = len(matrices)
+        self.states = np.full(self.count, IDLE)
+        self.colors = np.tile(np.array(RING_COLORS[IDLE], dtype=np.float32), (self.count, 1))
+
+        self.instanced = supportsInstancing()
+        if not self.instanced:
+            self.node = NodePath(parent).attachNewNode("rings")
+            self.node.setLightOff()
+            self.rings = []
+            for matrix in matrices:
+                ring = self.node.attachNewNode("ring")
+                ring.setMat(LMatrix4f(*matrix.ravel().tolist()))
+                ring.setColor(RING_COLORS[IDLE])
+                ringTemplate().instanceTo(ring)
+                self.rings.append(ring)
+            return
+
+        self.matrices = bufferTexture("ringMatrices", matrices, GeomEnums.UH_static)
+        self.colorBuffer = bufferTexture("ringColors", self.colors, GeomEnums.UH_dynamic)
+
+        self.node = ringTemplate().copyTo(NodePath(parent))
+        self.node.setShader(Shader.make(Shader.SL_GLSL, RING_VERTEX, RING_FRAGMENT))
+        self.node.setShaderInput("ringMatrices", self.matrices)
+        self.node.setShaderInput("ringColors", self.colorBuffer)
+        self.node.setInstanceCount(self.count)
+
+        # Instances are placed by the shader, so the template's own bounds mean nothing
+        self.node.node().setBounds(OmniBoundingVolume())
+        self.node.node().setFinal(True)
+
+        # An instance count of zero draws the template once, uninstanced
+        if not self.count:
+            self.node.hide()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def setColor(self, i: int, num: int):
         """
-        Set the color of a ring
-        :param num: 0 - White, 1 - Yellow, 2 - Green
+        Set the color of ring i
+        :param num: IDLE (0) - White, NEXT (1) - Yellow, PASSED (2) - Green
         :return: None
         """
-        color = None
-        if num == 0:
-            color = (255, 255, 255, 1)
-        elif num == 1:
-            color = (255, 255, 0, 1)
-        elif num == 2:
-            color = (0, 255, 0, 1)
+        if num != self.states[i]:
+            self.states[i] = num
+            self.colors[i] = RING_COLORS[num]
+            if self.instanced:
+                self.upload(i)
+            else:
+                self.rings[i].setColor(RING_COLORS[num])
+
+    def reset(self):
+        """ Set every ring back to idle """
+        changed = np.flatnonzero(self.states != IDLE)
+        if len(changed):
+            self.states[:] = IDLE
+            self.colors[:] = RING_COLORS[IDLE]
+            if self.instanced:
+                self.upload()
+            else:
+                for i in changed:
+                    self.rings[i].setColor(RING_COLORS[IDLE])
+
+    def upload(self, i: int = None):
+        """ Copy the color of ring i, or of every ring, into the color buffer """
+        texels = np.frombuffer(self.colorBuffer.modifyRamImage(), dtype=np.float32).reshape(-1, 4)
+        if i is None:
+            texels[:self.count] = self.colors
         else:
-            pass
-
-        for i in range(self.line.getNumVertices()):
-            self.line.setVertexColor(i, color[0], color[1], color[2], color[3])
+            texels[i] = self.colors[i]
@@ -0,0 +1,10 @@
+"""
+Headless flight simulation. Nothing in this package depends on Panda3D, so
+flights can be stepped, tested and analysed without a window.
+"""
+from src.sim.controls import TOR_UP, TOR_DOWN, CURV_UP, CURV_DOWN, TOR_ZERO, CURV_ZERO, commandFromKeyMap
+from src.sim.course import Course
+from src.sim.flight import Flight, FlightBatch, SCALE
+from src.sim.heightfield import Heightfield
+from src.sim.rules import Ring, belowGround, circleCourse, hitsGround
+from src.sim.state import FlightState, START, FLYING, CRASHED, COMPLETE, RING_PASSED, CRASH, FINISHED
@@ -0,0 +1,28 @@
+from typing import Dict
+
+# Input commands, one bit per control, combined with |
+TOR_UP = 1 << 0
+TOR_DOWN = 1 << 1
+CURV_UP = 1 << 2
+CURV_DOWN = 1 << 3
+TOR_ZERO = 1 << 4
+CURV_ZERO = 1 << 5
+
+KEYS = {
+    "tor+": TOR_UP,
+    "tor-": TOR_DOWN,
+    "curv+": CURV_UP,
+    "curv-": CURV_DOWN,
+    "tor0": TOR_ZERO,
+    "curv0": CURV_ZERO
+}
+
+
+def commandFromKeyMap(keyMap: Dict[str, bool]) -> int:
+    """ Command for the controls held down in a MyApp.keyMap """
+    command = 0
+    for key, bit in KEYS.items():
+        if keyMap.get(key):
+            command |= bit
+
+    return command
@@ -0,0 +1,166 @@
+"""
+Ring courses compiled from level files. A level is JSON listing its rings,
+either one at a time as discs or generated around a circle
+
+    {
+        "name": "Level 1: Circles",
+        "description": "Set a positive curvature to make a circle",
+        "rings": [
+            {"center": [0, 100, 40], "normal": [0, 1, 0], "radius": 10},
+            {"circle": {"center": [110, 110, 40], "radius": 100, "ringRadius": 10, "segments": 12, "count": 9}}
+        ]
+    }
+
+Compiling precomputes everything drawing and flying the course needs, the
+transform of each ring and the plane and radius of its pass test, and saves
+them as arrays which load in one read. The game's levels are compiled with
+its other assets by `python -m src.build`, and any other level with
+
+    python -m src.build --level levels/custom.json
+"""
+import json
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.sim.rules import Ring, circleCourse
+
+
+def discFrames(normals: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unit vectors u and v spanning the plane of each disc, v as close to up
+    as possible, with u = normal x v. For a ring of a circle course u points
+    away from the circle's center as in TorusCircle.
+    """
+    up = np.where(np.abs(normals[:, 2:3]) < 0.999, (0.0, 0.0, 1.0), (1.0, 0.0, 0.0))
+    v = up - np.einsum("ij,ij->i", up, normals)[:, None] * normals
+    v /= np.linalg.norm(v, axis=1)[:, None]
+
+    return np.cross(normals, v), v
+
+
+def ringsFromSpec(spec: Dict) -> List[Tuple[np.ndarray, np.ndarray, float]]:
+    """ (center, normal, radius) of each ring listed in a level """
+    discs = []
+    for entry in spec["rings"]:
+        if "circle" in entry:
+            circle = entry["circle"]
+            rings = circleCourse(tuple(circle["center"]), circle["radius"], circle["ringRadius"],
+                                 circle.get("segments", 12), circle.get("count", 9))
+            discs.extend((np.array(ring.center, dtype=float), np.array(ring.normal, dtype=float), ring.radius)
+                         for ring in rings)
+        else:
+            normal = np.array(entry["normal"], dtype=float)
+            discs.append((np.array(entry["center"], dtype=float), normal / np.linalg.norm(normal),
+                          float(entry["radius"])))
+
+    return discs
+
+
+class Course:
+    """
+    A compiled ring course, flown in order. Every array has one row per
+    ring: the center, normal and radius of its disc, the transform taking
+    the unit circle in the xz plane onto the ring and its inverse, in
+    Panda3D's row vector convention, and its plane (normal, offset) for the
+    pass test.
+
+    As the rings are flown in order a flight only ever tests its next ring,
+    a constant cost per tick however many rings the course has, so there is
+    no spatial index over the rings.
+    """
+    ARRAYS = ("centers", "normals", "radii", "transforms", "inverses", "planes")
+
+    def __init__(self, name: str, description: str, **arrays: np.ndarray):
+        self.name = name
+        self.description = description
+        for key in self.ARRAYS:
+            setattr(self, key, arrays[key])
+
+        # Plain lists for the per tick pass test, which only indexes single rings
+        self.centerRows = self.centers.tolist()
+        self.planeRows = self.planes.tolist()
+        self.radii2 = (self.radii ** 2).tolist()
+
+    def __len__(self) -> int:
+        return len(self.radii)
+
+    @classmethod
+    def compile(cls, discs: Sequence[Tuple[np.ndarray, np.ndarray, float]], name: str = "",
+                description: str = "") -> "Course":
+        n = len(discs)
+        centers = np.array([disc[0] for disc in discs], dtype=float).reshape(n, 3)
+        normals = np.array([disc[1] for disc in discs], dtype=float).reshape(n, 3)
+        radii = np.array([disc[2] for disc in discs], dtype=float)
+
+        u, v = discFrames(normals)
+        transforms = np.zeros((n, 4, 4))
+        transforms[:, 0, 0:3] = radii[:, None] * u
+        transforms[:, 1, 0:3] = radii[:, None] * normals
+        transforms[:, 2, 0:3] = radii[:, None] * v
+        transforms[:, 3, 0:3] = centers
+        transforms[:, 3, 3] = 1
+        inverses = np.linalg.inv(transforms) if n else transforms.copy()
+
+        planes = np.column_stack((normals, -np.einsum("ij,ij->i", normals, centers)))
+
+        return cls(name, description, centers=centers, normals=normals, radii=radii,
+                   transforms=transforms, inverses=inverses, planes=planes)
+
+    @classmethod
+    def fromRings(cls, rings: Sequence[Ring], name: str = "", description: str = "") -> "Course":
+        return cls.compile([(np.array(ring.center, dtype=float), np.array(ring.normal, dtype=float), ring.radius)
+                            for ring in rings], name, description)
+
+    @classmethod
+    def fromSpec(cls, spec: Dict) -> "Course":
+        return cls.compile(ringsFromSpec(spec), spec.get("name", ""), spec.get("description", ""))
+
+    @classmethod
+    def fromLevel(cls, path: str) -> "Course":
+        """ Compile a JSON level file """
+        with open(path) as f:
+            return cls.fromSpec(json.load(f))
+
+    def save(self, path: str):
+        """ Save as an uncompressed npz, so loading is a single read of each array """
+        with open(path, "wb") as f:
+            np.savez(f, name=np.array(self.name), description=np.array(self.description),
+                     **{key: getattr(self, key) for key in self.ARRAYS})
+
+    @classmethod
+    def load(cls, path) -> "Course":
+        """ Load a saved course from a path or a binary file object """
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {key: data[key] for key in cls.ARRAYS}
+            return cls(str(data["name"]), str(data["description"]), **arrays)
+
+    def crosses(self, i: int, p0, p1) -> bool:
+        """ Check if the segment from p0 to p1 passes through the interior of ring i """
+        nx, ny, nz, d = self.planeRows[i]
+        d0 = nx * p0[0] + ny * p0[1] + nz * p0[2] + d
+        d1 = nx * p1[0] + ny * p1[1] + nz * p1[2] + d
+
+        if d0 * d1 > 0 or d0 == d1:
+            return False
+
+        # Distance from the ring's center where the segment meets its plane
+        t = d0 / (d0 - d1)
+        c = self.centerRows[i]
+        x = p0[0] + t * (p1[0] - p0[0]) - c[0]
+        y = p0[1] + t * (p1[1] - p0[1]) - c[1]
+        z = p0[2] + t * (p1[2] - p0[2]) - c[2]
+
+        return x * x + y * y + z * z <= self.radii2[i]
+
+    def crossesMany(self, rings: np.ndarray, p0: np.ndarray, p1: np.ndarray) -> np.ndarray:
+        """ The test of crosses for many segments at once, whether each p0[k] to p1[k] passes through ring rings[k] """
+        plane = self.planes[rings]
+        d0 = np.einsum("ij,ij->i", p0, plane[:, 0:3]) + plane[:, 3]
+        d1 = np.einsum("ij,ij->i", p1, plane[:, 0:3]) + plane[:, 3]
+        # Segments parallel to the plane give t of inf or nan, and are rejected by d0 != d1 below
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = d0 / (d0 - d1)
+            hit = p0 + t[:, None] * (p1 - p0) - self.centers[rings]
+
+        return (d0 * d1 <= 0) & (d0 != d1) & (np.einsum("ij,ij->i", hit, hit) <= self.radii[rings] ** 2)
@@ -0,0 +1,157 @@
+from typing import Iterable, List, Sequence, Union
+
+import numpy as np
+
+from src.curves import propagate_frenet_serre, propagate_frenet_serre_batch, STEP
+from src.sim.controls import TOR_UP, TOR_DOWN, CURV_UP, CURV_DOWN, TOR_ZERO, CURV_ZERO
+from src.sim.course import Course
+from src.sim.heightfield import Heightfield
+from src.sim.rules import Ring, belowGround, hitsGround
+from src.sim.state import FlightState, FLYING, CRASHED, COMPLETE, RING_PASSED, CRASH, FINISHED
+
+# Change in curvature or torsion per tick while a control is held
+SCALE = 0.001
+
+
+class Flight:
+    """
+    Steps a FlightState one tick at a time under input commands, applying
+    the ground collision and ring rules. The rings must be flown in order,
+    and a ring is passed when the step between two ticks goes through it.
+    The rings are a compiled Course, or a sequence of Rings compiled into
+    one. The ground is the given Heightfield, or flat at height GROUND.
+    """
+
+    def __init__(self, state: FlightState, rings: Union[Course, Sequence[Ring]] = (), scale: float = SCALE,
+                 step: float = STEP, ground: Heightfield = None):
+        self.state = state
+        self.rings = rings
+        self.ground = ground
+        self.course = rings if isinstance(rings, Course) else Course.fromRings(rings)
+        self.scale = scale
+        self.stepLength = step
+
+    def step(self, command: int = 0) -> int:
+        """ Advance one tick with the given command, returning the events that occurred """
+        state = self.state
+        if state.status != FLYING:
+            return 0
+
+        if command & TOR_UP:
+            state.tau += self.scale
+        if command & TOR_DOWN:
+            state.tau -= self.scale
+        if command & CURV_UP:
+            state.kappa += self.scale
+        if command & CURV_DOWN:
+            state.kappa -= self.scale
+        if command & CURV_ZERO:
+            state.kappa = 0
+        if command & TOR_ZERO:
+            state.tau = 0
+
+        y = state.y
+        prev = y[0:3]
+        state.y = propagate_frenet_serre(y[0:3], y[3:6], y[6:9], y[9:12], state.kappa, state.tau, self.stepLength)
+        state.tick += 1
+
+        if hitsGround(state.y, self.ground):
+            state.status = CRASHED
+            return CRASH
+
+        events = 0
+        if state.ring < len(self.course) and self.course.crosses(state.ring, prev, state.y[0:3]):
+            state.ring += 1
+            events |= RING_PASSED
+
+            if state.ring == len(self.course):
+                state.status = COMPLETE
+                events |= FINISHED
+
+        return events
+
+    def run(self, commands: Iterable[int]) -> List[int]:
+        """ Step through a sequence of commands, stopping early once the flight ends """
+        events = []
+        for command in commands:
+            if self.state.status != FLYING:
+                break
+            events.append(self.step(command))
+
+        return events
+
+
+class FlightBatch:
+    """
+    Many flights stepped together under the rules of Flight, one row of each
+    array per flight, with every flight's curve advanced by one call to
+    propagate_frenet_serre_batch a tick. Flights which have ended stop
+    changing.
+    """
+
+    def __init__(self, y: np.ndarray, rings: Union[Course, Sequence[Ring]] = (), scale: float = SCALE,
+                 step: float = STEP, ground: Heightfield = None):
+        self.y = np.array(y, dtype=float)
+        n = len(self.y)
+        self.kappa = np.zeros(n)
+        self.tau = np.zeros(n)
+        self.tick = np.zeros(n, dtype=np.int64)
+        self.ring = np.zeros(n, dtype=np.int64)
+        self.status = np.full(n, FLYING)
+        self.course = rings if isinstance(rings, Course) else Course.fromRings(rings)
+        self.ground = ground
+        self.scale = scale
+        self.stepLength = step
+
+    def __len__(self) -> int:
+        return len(self.y)
+
+    def step(self, commands: np.ndarray) -> np.ndarray:
+        """ Advance the flights still flying one tick, each with its command, returning their events """
+        events = np.zeros(len(self), dtype=np.int64)
+        flying = np.flatnonzero(self.status == FLYING)
+        if not len(flying):
+            return events
+
+        commands = np.asarray(commands)[flying]
+        kappa, tau = self.kappa[flying], self.tau[flying]
+        tau = np.where(commands & TOR_UP, tau + self.scale, tau)
+        tau = np.where(commands & TOR_DOWN, tau - self.scale, tau)
+        kappa = np.where(commands & CURV_UP, kappa + self.scale, kappa)
+        kappa = np.where(commands & CURV_DOWN, kappa - self.scale, kappa)
+        kappa = np.where(commands & CURV_ZERO, 0, kappa)
+        tau = np.where(commands & TOR_ZERO, 0, tau)
+        self.kappa[flying], self.tau[flying] = kappa, tau
+
+        prev = self.y[flying, 0:3]
+        y = propagate_frenet_serre_batch(self.y[flying], kappa, tau, self.stepLength)
+        self.y[flying] = y
+        self.tick[flying] += 1
+
+        pos = y[:, 0:3]
+        crashed = belowGround(pos, self.ground)
+        self.status[flying[crashed]] = CRASHED
+        events[flying[crashed]] = CRASH
+
+        # Each flight still flying checks its next ring
+        course = self.course
+        ring = self.ring[flying]
+        checking = np.flatnonzero(~crashed & (ring < len(course)))
+        if len(checking):
+            passed = course.crossesMany(ring[checking], prev[checking], pos[checking])
+
+            rows = flying[checking[passed]]
+            self.ring[rows] += 1
+            events[rows] |= RING_PASSED
+            finished = rows[self.ring[rows] == len(course)]
+            self.status[finished] = COMPLETE
+            events[finished] |= FINISHED
+
+        return events
+
+    def run(self, commands: np.ndarray):
+        """ Step through commands of shape (n, ticks), one row per flight, stopping once every flight has ended """
+        for column in np.asarray(commands).T:
+            if not (self.status == FLYING).any():
+                break
+            self.step(column)
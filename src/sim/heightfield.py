@@ -0,0 +1,108 @@
+from math import floor
+from typing import Tuple
+
+import numpy as np
+
+# The ground under the game's terrain, compiled from its heightfield image by `python -m src.build`
+TERRAIN_GROUND = "compiled/models/terrain/black.npz"
+
+
+class Heightfield:
+    """
+    Ground heights sampled on a regular grid, heights[i, j] being the height
+    at origin + (i, j) * spacing before multiplying by `scale`. Heights
+    between samples are interpolated bilinearly. A periodic heightfield
+    repeats every (n - 1) * spacing, the last row and column matching the
+    first, otherwise points off the grid take the height of its edge.
+    """
+
+    def __init__(self, heights: np.ndarray, spacing: float = 1.0, scale: float = 1.0,
+                 origin: Tuple[float, float] = (0, 0), periodic: bool = False):
+        self.data = np.asarray(heights, dtype=np.float64) * scale
+        self.spacing = spacing
+        self.origin = origin
+        self.periodic = periodic
+        self.nx = self.data.shape[0] - 1
+        self.ny = self.data.shape[1] - 1
+
+    def save(self, path: str):
+        """ Save as an uncompressed npz, which loads with NumPy alone """
+        with open(path, "wb") as f:
+            np.savez(f, heights=self.data, spacing=self.spacing, origin=np.array(self.origin, dtype=float),
+                     periodic=self.periodic)
+
+    @classmethod
+    def load(cls, path) -> "Heightfield":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["heights"], float(data["spacing"]), origin=tuple(data["origin"].tolist()),
+                       periodic=bool(data["periodic"]))
+
+    def cell(self, u: float, v: float) -> Tuple[int, int, float, float]:
+        if self.periodic:
+            u %= self.nx
+            v %= self.ny
+        else:
+            u = min(max(u, 0), self.nx)
+            v = min(max(v, 0), self.ny)
+
+        i = min(int(floor(u)), self.nx - 1)
+        j = min(int(floor(v)), self.ny - 1)
+
+        return i, j, u - i, v - j
+
+    def height(self, x: float, y: float) -> float:
+        """ Height of the ground at (x, y) """
+        i, j, fu, fv = self.cell((x - self.origin[0]) / self.spacing, (y - self.origin[1]) / self.spacing)
+        h = self.data
+
+        return ((h[i, j] * (1 - fu) + h[i + 1, j] * fu) * (1 - fv)
+                + (h[i, j + 1] * (1 - fu) + h[i + 1, j + 1] * fu) * fv)
+
+    def heights(self, x, y) -> np.ndarray:
+        """ Height of the ground under each of the points (x, y) """
+        u = (np.asarray(x, dtype=np.float64) - self.origin[0]) / self.spacing
+        v = (np.asarray(y, dtype=np.float64) - self.origin[1]) / self.spacing
+        if self.periodic:
+            u = u % self.nx
+            v = v % self.ny
+        else:
+            u = np.clip(u, 0, self.nx)
+            v = np.clip(v, 0, self.ny)
+
+        i = np.minimum(u.astype(np.intp), self.nx - 1)
+        j = np.minimum(v.astype(np.intp), self.ny - 1)
+        fu = u - i
+        fv = v - j
+        h = self.data
+
+        return ((h[i, j] * (1 - fu) + h[i + 1, j] * fu) * (1 - fv)
+                + (h[i, j + 1] * (1 - fu) + h[i + 1, j + 1] * fu) * fv)
+
+    def below(self, points: np.ndarray) -> np.ndarray:
+        """ Whether each row (x, y, z) of points is on or below the ground """
+        points = np.asarray(points)
+        return points[:, 2] <= self.heights(points[:, 0], points[:, 1])
+
+    def firstImpact(self, points: np.ndarray) -> int:
+        """
+        Where a polyline through points first reaches the ground, or -1. Each
+        chord is walked at the spacing of the heightfield, so ground rising
+        between sparse points is still found. The index is of the point
+        ending the chord which reaches the ground, 0 if the first point is
+        on or below it.
+        """
+        points = np.asarray(points, dtype=np.float64)
+        if self.below(points[:1]).any():
+            return 0
+        if len(points) < 2:
+            return -1
+
+        a, chords = points[:-1], np.diff(points, axis=0)
+        steps = np.maximum(np.ceil(np.hypot(chords[:, 0], chords[:, 1]) / self.spacing), 1).astype(np.intp)
+        chord = np.repeat(np.arange(len(chords)), steps)
+        t = (np.arange(len(chord)) - np.repeat(np.cumsum(steps) - steps, steps) + 1) / steps[chord]
+
+        below = self.below(a[chord] + t[:, None] * chords[chord])
+        index = int(np.argmax(below))
+
+        return int(chord[index]) + 1 if below[index] else -1
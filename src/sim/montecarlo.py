@@ -0,0 +1,211 @@
+"""
+Monte Carlo difficulty analysis of a level. Thousands of flights fly
+perturbed copies of a nominal set of inputs, the schedule found by the
+solver or a recorded flight, under the ground and ring rules of Flight.
+
+A player holds each control, or lets go of all of them, for a little more
+or less time than intended, so every run of identical commands is
+lengthened or shortened by a normally distributed number of ticks, and the
+plane starts a little away from its intended start. The perturbed inputs
+are flown as they are, with no correction, so errors compound along the
+course and the probabilities are for comparing levels rather than
+predicting how often players finish.
+
+Flights are split into chunks of a fixed size, each seeded from the seed
+and its index alone, and the chunks are flown across a pool of processes,
+so the results for a seed do not depend on the number of workers.
+
+    python -m src.sim.montecarlo levels/tutorial1.json --flights 10000 --seed 1
+    python -m src.sim.montecarlo levels/tutorial1.json --recording recordings/tutoriallevel1-...rec
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.sim.course import Course
+from src.sim.flight import FlightBatch
+from src.sim.heightfield import Heightfield, TERRAIN_GROUND
+from src.sim.state import FlightState, CRASHED, COMPLETE
+
+# Flights per chunk, the unit of work given to a process and of seeding
+CHUNK = 512
+
+# Extra ticks flown past the end of the nominal inputs with no controls held
+SLACK = 600
+
+# Standard deviation of the change in length of each run of commands, ticks
+TIMING = 1.0
+
+# Standard deviation of the start position, in each axis
+START_NOISE = 0.2
+
+# Side of the cells crash locations are counted in
+CRASH_CELL = 20.0
+
+Results = namedtuple("Results", ["status", "ring", "tick", "pos"])
+
+# Set in each worker process by setup, so the inputs are sent once rather than with every chunk
+_job = None
+
+
+def runs(commands: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """ Run length encoding of commands, the command and length of each run """
+    commands = np.asarray(commands, dtype=np.int64)
+    if not len(commands):
+        return commands, commands
+
+    starts = np.flatnonzero(np.diff(commands, prepend=commands[0] - 1))
+    lengths = np.diff(np.append(starts, len(commands)))
+
+    return commands[starts], lengths
+
+
+def perturbed(values: np.ndarray, lengths: np.ndarray, rng: np.random.Generator, timing: float,
+              ticks: int) -> np.ndarray:
+    """ The commands with the length of each run changed by N(0, timing) ticks, padded with no controls to ticks """
+    change = np.rint(rng.normal(0, timing, len(lengths))).astype(np.int64)
+    commands = np.repeat(values, np.maximum(lengths + change, 0))[:ticks]
+
+    return np.concatenate((commands, np.zeros(ticks - len(commands), dtype=np.int64)))
+
+
+def setup(course: Course, start: FlightState, commands: Sequence[int], ground: Heightfield, timing: float,
+          startNoise: float):
+    global _job
+    _job = (course, start, runs(commands), len(commands) + SLACK, ground, timing, startNoise)
+
+
+def flyChunk(seed: np.random.SeedSequence, count: int) -> Results:
+    """ Fly count perturbed flights, the perturbations drawn from seed """
+    course, start, (values, lengths), ticks, ground, timing, startNoise = _job
+    rng = np.random.default_rng(seed)
+
+    commands = np.array([perturbed(values, lengths, rng, timing, ticks) for _ in range(count)])
+    y = np.tile(start.y, (count, 1))
+    y[:, 0:3] += rng.normal(0, startNoise, (count, 3))
+
+    batch = FlightBatch(y, course, ground=ground)
+    batch.kappa[:], batch.tau[:] = start.kappa, start.tau
+    batch.run(commands)
+
+    return Results(batch.status, batch.ring, batch.tick, batch.y[:, 0:3])
+
+
+def simulate(course: Course, commands: Sequence[int], flights: int = 10000, seed: int = 0, workers: int = None,
+             start: FlightState = None, ground: Heightfield = None, timing: float = TIMING,
+             startNoise: float = START_NOISE) -> Results:
+    """
+    Fly perturbed copies of commands from start, by default
+    FlightState.start(), through the course, across `workers` processes,
+    one per CPU by default
+    """
+    start = start if start is not None else FlightState.start()
+    counts = [min(CHUNK, flights - i) for i in range(0, flights, CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    job = (course, start, commands, ground, timing, startNoise)
+
+    if workers == 1:
+        setup(*job)
+        chunks = [flyChunk(s, n) for s, n in zip(seeds, counts)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=setup, initargs=job) as pool:
+            chunks = list(pool.map(flyChunk, seeds, counts))
+
+    return Results(*(np.concatenate(field) for field in zip(*chunks)))
+
+
+def report(results: Results, course: Course, cell: float = CRASH_CELL, top: int = 10) -> List[str]:
+    """ Lines summarising completion, where flights stopped and where they crashed """
+    n = len(results.status)
+    complete = results.status == COMPLETE
+    crashed = results.status == CRASHED
+    missed = ~complete & ~crashed
+
+    # A flight which did not finish stopped at the ring it had not yet passed
+    lines = ["%d flights, %.1f%% complete, %.1f%% crashed, %.1f%% missed a ring" % (
+        n, 100 * complete.mean(), 100 * crashed.mean(), 100 * missed.mean())]
+    if complete.any():
+        lines.append("completed in %.0f ticks on average, %d fastest" % (
+            results.tick[complete].mean(), results.tick[complete].min()))
+
+    lines.append("ring  passed  crashed before  missed")
+    stoppedCrashed = np.bincount(results.ring[crashed], minlength=len(course) + 1)
+    stoppedMissed = np.bincount(results.ring[missed], minlength=len(course) + 1)
+    for i in range(len(course)):
+        lines.append("%4d  %5.1f%%  %13.1f%%  %5.1f%%" % (
+            i + 1, 100 * (results.ring > i).mean(), 100 * stoppedCrashed[i] / n, 100 * stoppedMissed[i] / n))
+
+    if crashed.any():
+        cells, counts = np.unique(np.floor(results.pos[crashed, 0:2] / cell).astype(np.int64), axis=0,
+                                  return_counts=True)
+        lines.append("crash locations, %g unit cells" % cell)
+        for i in np.argsort(-counts, kind="stable")[:top]:
+            x, y = cells[i] * cell
+            lines.append("  (%6.0f, %6.0f) - (%6.0f, %6.0f)  %5.1f%%" % (
+                x, y, x + cell, y + cell, 100 * counts[i] / n))
+
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("level", help="JSON level file")
+    parser.add_argument("--flights", type=int, default=10000, help="number of flights to fly")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the perturbations")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to fly the flights in")
+    parser.add_argument("--timing", type=float, default=TIMING,
+                        help="standard deviation of the length of each run of commands, ticks")
+    parser.add_argument("--start-noise", type=float, default=START_NOISE,
+                        help="standard deviation of the start position")
+    parser.add_argument("--recording", help="fly perturbations of this recording rather than the solver's inputs")
+    parser.add_argument("--output", help="save the result of every flight to this npz")
+    parser.add_argument("--terrain", default=TERRAIN_GROUND,
+                        help="compiled heightfield to crash into, by default the game's terrain from src.build")
+    parser.add_argument("--flat", action="store_true", help="crash into the flat plane at GROUND instead of terrain")
+    args = parser.parse_args(argv)
+
+    course = Course.fromLevel(args.level)
+
+    ground = None
+    if not args.flat:
+        if not os.path.exists(args.terrain):
+            parser.error("no heightfield at %s, compile the game's terrain with python -m src.build or pass --flat"
+                         % args.terrain)
+        ground = Heightfield.load(args.terrain)
+
+    if args.recording:
+        from src.sim.recorder import FlightLog
+
+        log = FlightLog(args.recording)
+        start, commands = log.start(), log.commands.tolist()
+    else:
+        from src.sim.solver import solve
+
+        solution = solve(course, ground=ground)
+        if solution is None:
+            print("No inputs found flying %s to perturb" % (course.name or args.level))
+            return 1
+        start, commands = FlightState.start(), solution.commands
+
+    begin = time.perf_counter()
+    results = simulate(course, commands, args.flights, args.seed, args.workers, start, ground,
+                       timing=args.timing, startNoise=args.start_noise)
+    elapsed = time.perf_counter() - begin
+
+    print("%s, seed %d, %d workers, %.1f s" % (course.name or args.level, args.seed, args.workers, elapsed))
+    print("\n".join(report(results, course)))
+
+    if args.output:
+        np.savez(args.output, **results._asdict())
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
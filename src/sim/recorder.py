@@ -0,0 +1,322 @@
+"""
+Flight recordings. A recording is a fixed size header holding the start
+state, one 64 byte record per tick and a footer of keyframes, exact states
+every `interval` ticks from which the flight can be re-simulated, and
+the state the flight finished in.
+
+    header | record * ticks | keyframe * n | trailer
+
+Records hold the command and events of each tick and the state after it in
+single precision, for analysis. Keyframes hold the state in double
+precision, so re-simulating the recorded commands from one reproduces the
+flight exactly. A recording which was never closed has no footer, and is
+re-simulated from the start state in the header. How a closed flight
+ended is read from its last keyframe alone, so recordings can be ranked
+and pruned without reading their records.
+
+Summarise recordings with
+
+    python -m src.sim.recorder recordings/*.rec
+"""
+import argparse
+import glob
+import os
+import sys
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.sim.flight import Flight
+from src.sim.heightfield import Heightfield
+from src.sim.rules import Ring
+from src.sim.state import FlightState, FLYING, CRASHED, COMPLETE, RING_PASSED
+
+MAGIC = b"FLIGHTRC"
+TRAILER_MAGIC = b"KEYS"
+VERSION = 1
+
+KEYFRAME = np.dtype([
+    ("tick", "<u4"),
+    ("ring", "<u4"),
+    ("status", "<u4"),
+    ("pad", "<u4"),
+    ("kappa", "<f8"),
+    ("tau", "<f8"),
+    ("y", "<f8", (12,))
+])
+
+HEADER = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("interval", "<u4"),
+    ("step", "<f8"),
+    ("scale", "<f8"),
+    ("start", KEYFRAME)
+])
+
+RECORD = np.dtype([
+    ("tick", "<u4"),
+    ("command", "<u2"),
+    ("events", "u1"),
+    ("status", "u1"),
+    ("kappa", "<f4"),
+    ("tau", "<f4"),
+    ("y", "<f4", (12,))
+])
+
+TRAILER = np.dtype([
+    ("offset", "<u8"),
+    ("count", "<u4"),
+    ("magic", "S4")
+])
+
+STATUS = {FLYING: "flying", CRASHED: "crashed", COMPLETE: "complete"}
+
+
+def keyframe(state: FlightState) -> np.ndarray:
+    frame = np.zeros((), dtype=KEYFRAME)
+    frame["tick"] = state.tick
+    frame["ring"] = state.ring
+    frame["status"] = state.status
+    frame["kappa"] = state.kappa
+    frame["tau"] = state.tau
+    frame["y"] = state.y
+
+    return frame
+
+
+def stateFromKeyframe(frame) -> FlightState:
+    return FlightState(np.array(frame["y"], dtype=float), float(frame["kappa"]), float(frame["tau"]),
+                       int(frame["tick"]), int(frame["ring"]), int(frame["status"]))
+
+
+class FlightRecorder:
+    """
+    Writes a recording of a Flight, one `record` call after each step.
+    Records are buffered `bufferSize` at a time and the keyframes are
+    written by `close`.
+    """
+
+    def __init__(self, path: str, flight: Flight, interval: int = 600, bufferSize: int = 1024):
+        self.path = path
+        self.flight = flight
+        self.interval = interval
+
+        self.buffer = np.zeros(bufferSize, dtype=RECORD)
+        self.buffered = 0
+        self.ticks = 0
+        self.keyframes = [keyframe(flight.state)]
+
+        header = np.zeros((), dtype=HEADER)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["interval"] = interval
+        header["step"] = flight.stepLength
+        header["scale"] = flight.scale
+        header["start"] = self.keyframes[0]
+
+        self.file = open(path, "wb")
+        self.file.write(header.tobytes())
+
+    def record(self, command: int, events: int):
+        """ Record the step just taken with command, which returned events """
+        state = self.flight.state
+        row = self.buffer[self.buffered]
+        row["tick"] = state.tick
+        row["command"] = command
+        row["events"] = events
+        row["status"] = state.status
+        row["kappa"] = state.kappa
+        row["tau"] = state.tau
+        row["y"] = state.y
+
+        self.buffered += 1
+        self.ticks += 1
+        if self.buffered == len(self.buffer):
+            self.flush()
+
+        if state.tick % self.interval == 0:
+            self.keyframes.append(keyframe(state))
+
+    def flush(self):
+        self.file.write(self.buffer[:self.buffered].tobytes())
+        self.buffered = 0
+
+    def close(self):
+        if self.file.closed:
+            return
+
+        # The last keyframe is always the final state
+        if self.keyframes[-1]["tick"] != self.flight.state.tick:
+            self.keyframes.append(keyframe(self.flight.state))
+
+        self.flush()
+        offset = self.file.tell()
+        self.file.write(np.array(self.keyframes, dtype=KEYFRAME).tobytes())
+
+        trailer = np.zeros((), dtype=TRAILER)
+        trailer["offset"] = offset
+        trailer["count"] = len(self.keyframes)
+        trailer["magic"] = TRAILER_MAGIC
+        self.file.write(trailer.tobytes())
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FlightLog:
+    """
+    A recording opened for reading. The records are memory mapped, so
+    `records[i]` is the tick i + 1 and seeking anywhere is O(1).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.header = np.fromfile(path, dtype=HEADER, count=1)[0]
+        if self.header["magic"] != MAGIC:
+            raise ValueError("%s is not a flight recording" % path)
+        if self.header["version"] != VERSION:
+            raise ValueError("%s is version %d, expected %d" % (path, self.header["version"], VERSION))
+
+        size = os.path.getsize(path)
+        end = size
+        keyframes = None
+        if size >= HEADER.itemsize + TRAILER.itemsize:
+            trailer = np.fromfile(path, dtype=TRAILER, count=1, offset=size - TRAILER.itemsize)[0]
+            if trailer["magic"] == TRAILER_MAGIC:
+                end = int(trailer["offset"])
+                keyframes = np.fromfile(path, dtype=KEYFRAME, count=int(trailer["count"]), offset=end)
+
+        # A recording which was not closed may end part way through a record
+        count = (end - HEADER.itemsize) // RECORD.itemsize
+        if count > 0:
+            self.records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.itemsize, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD)
+        self.keyframes = keyframes if keyframes is not None else np.array([self.header["start"]], dtype=KEYFRAME)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @property
+    def commands(self) -> np.ndarray:
+        return self.records["command"]
+
+    @property
+    def positions(self) -> np.ndarray:
+        return self.records["y"][:, 0:3]
+
+    def start(self) -> FlightState:
+        return stateFromKeyframe(self.header["start"])
+
+    def final(self) -> FlightState:
+        """ Last recorded state, in the precision of the records """
+        if len(self.records) == 0:
+            return self.start()
+
+        row = self.records[-1]
+        ring = int(np.count_nonzero(self.records["events"] & RING_PASSED))
+        return FlightState(np.array(row["y"], dtype=float), float(row["kappa"]), float(row["tau"]),
+                           int(row["tick"]), ring, int(row["status"]))
+
+    def flight(self, tick: int, rings: Sequence[Ring] = (), ground: Heightfield = None) -> Flight:
+        """
+        Flight in the exact state after tick, re-simulated from the last
+        keyframe before it. The rings and ground must be those flown.
+        """
+        tick = min(max(tick, 0), len(self.records))
+        index = np.searchsorted(self.keyframes["tick"], tick, side="right") - 1
+
+        state = stateFromKeyframe(self.keyframes[index])
+        flight = Flight(state, rings, scale=float(self.header["scale"]), step=float(self.header["step"]),
+                        ground=ground)
+        flight.run(self.commands[state.tick:tick].tolist())
+
+        return flight
+
+    def state(self, tick: int, rings: Sequence[Ring] = (), ground: Heightfield = None) -> FlightState:
+        return self.flight(tick, rings, ground).state
+
+    def replay(self, rings: Sequence[Ring] = (), ground: Heightfield = None) -> np.ndarray:
+        """ Re-simulate the whole recording, returning the state after every tick in double precision """
+        flight = self.flight(0, rings, ground)
+        states = np.empty((len(self.records), 12))
+        for i, command in enumerate(self.commands.tolist()):
+            flight.step(command)
+            states[i] = flight.state.y
+
+        return states
+
+    def summary(self) -> str:
+        final = self.final()
+        return "%s: %d ticks, %s at (%.1f, %.1f, %.1f), %d rings, %d keyframes" % (
+            self.path, len(self), STATUS.get(final.status, "unknown"),
+            final.pos[0], final.pos[1], final.pos[2], final.ring, len(self.keyframes))
+
+
+def readFinal(path: str) -> Optional[FlightState]:
+    """
+    State a closed recording finished in, read from its header and footer
+    alone, or None if path is not a closed recording
+    """
+    header = np.fromfile(path, dtype=HEADER, count=1)
+    size = os.path.getsize(path)
+    if len(header) == 0 or header[0]["magic"] != MAGIC or header[0]["version"] != VERSION or \
+            size < HEADER.itemsize + TRAILER.itemsize:
+        return None
+
+    trailer = np.fromfile(path, dtype=TRAILER, count=1, offset=size - TRAILER.itemsize)[0]
+    if trailer["magic"] != TRAILER_MAGIC or trailer["count"] == 0:
+        return None
+
+    offset = int(trailer["offset"]) + (int(trailer["count"]) - 1) * KEYFRAME.itemsize
+    return stateFromKeyframe(np.fromfile(path, dtype=KEYFRAME, count=1, offset=offset)[0])
+
+
+def recordings(directory: str, prefix: str) -> List[str]:
+    """ Paths of the recordings in directory named prefix-..., oldest first as the names are timestamped """
+    return sorted(glob.glob(os.path.join(glob.escape(directory), glob.escape(prefix) + "-*.rec")))
+
+
+def fastest(paths: Sequence[str], count: int) -> List[str]:
+    """ The count recordings of completed flights which took the fewest ticks """
+    completed = []
+    for path in paths:
+        final = readFinal(path)
+        if final is not None and final.status == COMPLETE:
+            completed.append((final.tick, path))
+
+    return [path for _, path in sorted(completed)[:count]]
+
+
+def prune(directory: str, prefix: str, recent: int, best: int):
+    """ Delete the recordings named prefix-... except the `recent` newest and the `best` fastest """
+    paths = recordings(directory, prefix)
+    keep = set(paths[-recent:] if recent > 0 else []) | set(fastest(paths, best))
+
+    for path in paths:
+        if path not in keep:
+            try:
+                os.remove(path)
+            except OSError:
+                # Still open, for instance memory mapped by a ghost on Windows
+                pass
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="recordings to summarise")
+    args = parser.parse_args(argv)
+
+    for path in args.paths:
+        print(FlightLog(path).summary())
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+from math import cos, sin, pi
+from typing import List, Tuple
+
+import numpy as np
+
+# Height of the ground plane
+GROUND = 0
+
+
+def hitsGround(pos, ground=None) -> bool:
+    """ Check if the point pos is on or below the ground, a Heightfield or the plane at GROUND """
+    if ground is None:
+        return pos[2] <= GROUND
+    return pos[2] <= ground.height(pos[0], pos[1])
+
+
+def belowGround(points: np.ndarray, ground=None) -> np.ndarray:
+    """ The test of hitsGround for each point of an array of shape (..., 3) """
+    if ground is None:
+        return points[..., 2] <= GROUND
+    return points[..., 2] <= ground.heights(points[..., 0], points[..., 1])
+
+
+class Ring:
+    """
+    Circle which is a slice of a Torus, at angle theta around the torus.
+    Courses compile rings into a Course, which holds their pass test.
+    """
+
+    def __init__(self, theta: float, radius: float, outerCenter: Tuple[float, float, float], outerRadius: float):
+        self.theta = theta
+        self.radius = radius
+        self.outerCenter = outerCenter
+        self.outerRadius = outerRadius
+
+        # The ring is a disc facing along the outer circle
+        self.center = (
+            outerCenter[0] + outerRadius * cos(theta),
+            outerCenter[1] + outerRadius * sin(theta),
+            outerCenter[2]
+        )
+        self.normal = (-sin(theta), cos(theta), 0)
+
+
+def circleCourse(outerCenter: Tuple[float, float, float] = (110, 110, 40), outerRadius: float = 100,
+                 innerRadius: float = 10, numSegs: int = 12, numRings: int = 9) -> List[Ring]:
+    """ Rings spaced evenly around a circle, flown clockwise from theta = pi (Tutorial Level 1) """
+    angles = [pi - 2 * pi * i / numSegs for i in range(numRings)]
+
+    return [Ring(theta, innerRadius, outerCenter, outerRadius) for theta in angles]
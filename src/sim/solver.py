@@ -0,0 +1,312 @@
+"""
+Finds inputs which fly a course. Between rings the plane holds a constant
+curvature and torsion, reached by holding the controls one tick at a time
+as a player would, so each ring is one leg of a piecewise constant
+schedule. Every candidate curvature and torsion on a grid is flown at once
+with the batched closed form solution, and the legs which thread the ring
+pointing best at the next are kept to search the next leg from.
+
+    python -m src.sim.solver levels/tutorial1.json
+"""
+import argparse
+import os
+import sys
+import time
+from collections import namedtuple
+from typing import List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.curves import helix_coefficients, propagate_frenet_serre_batch, STEP
+from src.sim.controls import CURV_UP, CURV_DOWN, TOR_UP, TOR_DOWN
+from src.sim.course import Course
+from src.sim.flight import Flight, SCALE
+from src.sim.heightfield import Heightfield, TERRAIN_GROUND
+from src.sim.rules import Ring, belowGround
+from src.sim.state import FlightState, COMPLETE
+
+# Candidate curvatures and torsions of each leg, in multiples of the control scale
+KAPPAS = tuple(range(-30, 31, 2))
+TAUS = tuple(range(-20, 21, 4))
+
+# Ticks between the samples searched for a ring's plane before refining to single ticks
+STRIDE = 16
+
+# Fraction of a ring's radius a leg must pass within, so the flight clears it despite rounding
+MARGIN = 0.8
+
+# Controls held toward kappa and tau, in multiples of the control scale, for a number of ticks
+Segment = namedtuple("Segment", ["kappa", "tau", "ticks"])
+Solution = namedtuple("Solution", ["commands", "schedule", "state"])
+
+# A partial solution, the state after its last leg, the controls reached in multiples of the scale and ticks taken
+Leg = namedtuple("Leg", ["y", "kappa", "tau", "units", "ticks", "schedule"])
+
+
+def segmentCommands(units: Tuple[int, int], target: Tuple[int, int], ticks: int) -> List[int]:
+    """ Commands holding the controls from units toward target, both (kappa, tau), for ticks """
+    (k, t), (kt, tt) = units, target
+    commands = []
+    for _ in range(ticks):
+        command = 0
+        if k != kt:
+            command |= CURV_UP if k < kt else CURV_DOWN
+            k += 1 if k < kt else -1
+        if t != tt:
+            command |= TOR_UP if t < tt else TOR_DOWN
+            t += 1 if t < tt else -1
+        commands.append(command)
+
+    return commands
+
+
+def helixPositions(y: np.ndarray, kappa: np.ndarray, tau: np.ndarray, s: np.ndarray) -> np.ndarray:
+    """
+    Positions along curves of constant curvature and torsion from the states
+    y, at the arc lengths s, shape (m,) for every curve or (n, m) for each.
+    Only row 0 of the closed form's integral moves the position, which in
+    the initial frame is (s - c kappa^2, b kappa, c kappa tau).
+
+    :return: array of shape (n, m, 3)
+    """
+    s = np.broadcast_to(s, (len(y), np.shape(s)[-1]))
+    _, b, c = helix_coefficients(np.sqrt(kappa ** 2 + tau ** 2)[:, None], s)
+    k = kappa[:, None]
+    t, n, binormal = (s - c * k ** 2)[..., None], (b * k)[..., None], (c * k * tau[:, None])[..., None]
+
+    return y[:, None, 0:3] + t * y[:, None, 3:6] + n * y[:, None, 6:9] + binormal * y[:, None, 9:12]
+
+
+def firstCrossing(points: np.ndarray, plane: np.ndarray, center: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    For each row of points, the index i of the first step from points[i] to
+    points[i + 1] crossing the plane, as tested by Course.crosses, or -1 if
+    none does, and the squared distance from center of where it crosses
+    """
+    if points.shape[1] < 2:
+        return np.full(len(points), -1), np.full(len(points), np.inf)
+
+    d = points @ plane[0:3] + plane[3]
+    d0, d1 = d[:, :-1], d[:, 1:]
+    crossed = (d0 * d1 <= 0) & (d0 != d1)
+    index = np.where(crossed.any(axis=1), np.argmax(crossed, axis=1), -1)
+
+    rows = np.arange(len(points))
+    i = np.maximum(index, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = d0[rows, i] / (d0[rows, i] - d1[rows, i])
+    hit = points[rows, i] + t[:, None] * (points[rows, i + 1] - points[rows, i]) - center
+
+    return index, np.einsum("ij,ij->i", hit, hit)
+
+
+def holdCrossings(y: np.ndarray, kappa: np.ndarray, tau: np.ndarray, plane: np.ndarray, center: np.ndarray,
+                  ground: Heightfield, step: float, maxTicks: int, chunk: int = 16) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Samples STRIDE ticks apart, searched `chunk` at a time, between which
+    each held curve first crosses the plane without going below ground. The
+    index of the sample before the crossing, or -1, and the squared distance
+    from center where the straight line between the samples crosses.
+    """
+    n = len(y)
+    index = np.full(n, -1)
+    distance2 = np.full(n, np.inf)
+    searching = np.arange(n)
+    for first in range(0, maxTicks, STRIDE * chunk):
+        samples = np.arange(first, first + STRIDE * (chunk + 1), STRIDE) * step
+        points = helixPositions(y[searching], kappa[searching], tau[searching], samples)
+        crossing, hit = firstCrossing(points, plane, center)
+
+        underground = np.logical_or.accumulate(belowGround(points, ground), axis=1)
+        last = np.where(crossing >= 0, crossing + 1, chunk)
+        crashed = underground[np.arange(len(searching)), last]
+
+        found = (crossing >= 0) & ~crashed
+        index[searching[found]] = first // STRIDE + crossing[found]
+        distance2[searching[found]] = hit[found]
+
+        searching = searching[(crossing < 0) & ~crashed]
+        if not len(searching):
+            break
+
+    return index, distance2
+
+
+def scheduleCommands(schedule: Sequence[Segment], units: Tuple[int, int] = (0, 0)) -> List[int]:
+    """ Commands flying a schedule, starting from the controls units """
+    commands = []
+    for segment in schedule:
+        commands += segmentCommands(units, (segment.kappa, segment.tau), segment.ticks)
+        units = tuple(u + max(min(t - u, segment.ticks), -segment.ticks)
+                      for u, t in zip(units, (segment.kappa, segment.tau)))
+
+    return commands
+
+
+def rank(ends: np.ndarray, ticks: np.ndarray, effort: np.ndarray, course: Course, ring: int) -> np.ndarray:
+    """
+    Order of states by how directly they point at the next ring, ties broken
+    by ticks taken and then by the effort of the controls. Past the last
+    ring the ticks taken come first.
+    """
+    if ring >= len(course):
+        return np.lexsort((effort, ticks))
+
+    toward = course.centers[ring] - ends[:, 0:3]
+    cosine = np.einsum("ij,ij->i", toward, ends[:, 3:6]) / np.linalg.norm(toward, axis=1)
+
+    return np.lexsort((effort, ticks, -np.round(cosine, 3)))
+
+
+def flyLegs(legs: Sequence[Leg], grid: np.ndarray, course: Course, ring: int, ground: Heightfield = None,
+            scale: float = SCALE, step: float = STEP, maxTicks: int = 2000, beam: int = 4) -> List[Leg]:
+    """
+    Extend each leg toward every (kappa, tau) of the grid, returning the
+    `beam` best, by rank, which pass the ring
+    """
+    n = len(legs) * len(grid)
+    parent = np.repeat(np.arange(len(legs)), len(grid))
+    y = np.array([leg.y for leg in legs])[parent]
+    kappa = np.array([leg.kappa for leg in legs])[parent]
+    tau = np.array([leg.tau for leg in legs])[parent]
+    units = np.array([leg.units for leg in legs])[parent]
+    target = np.tile(grid, (len(legs), 1))
+
+    plane = np.array(course.planeRows[ring])
+    center = course.centers[ring]
+    radius2 = course.radii2[ring] * MARGIN ** 2
+
+    # Ramp the controls toward each target tick by tick, as Flight applies them
+    ramp = int(np.abs(target - units).max())
+    states = np.empty((n, ramp + 1, 12))
+    kappas = np.empty((n, ramp + 1))
+    taus = np.empty((n, ramp + 1))
+    states[:, 0], kappas[:, 0], taus[:, 0] = y, kappa, tau
+    for i in range(ramp):
+        delta = np.sign(target - units)
+        units = units + delta
+        kappa = kappa + delta[:, 0] * scale
+        tau = tau + delta[:, 1] * scale
+        y = propagate_frenet_serre_batch(y, kappa, tau, step)
+        states[:, i + 1], kappas[:, i + 1], taus[:, i + 1] = y, kappa, tau
+
+    # Flight checks the ground before the ring, so a leg crashes if any tick up to its crossing is below ground
+    crossing, hit = firstCrossing(states[..., 0:3], plane, center)
+    underground = np.logical_or.accumulate(belowGround(states[..., 0:3], ground), axis=1)
+    last = np.where(crossing >= 0, crossing + 1, ramp)
+    alive = ~underground[np.arange(n), last]
+    passed = alive & (crossing >= 0) & (hit <= radius2)
+    ticks = np.where(passed, crossing + 1, 0)
+
+    # Then hold them, searching samples STRIDE ticks apart for the ring's plane and refining to single ticks
+    holding = np.flatnonzero(alive & (crossing < 0))
+    if len(holding):
+        coarse, coarseHit = holdCrossings(y[holding], kappa[holding], tau[holding], plane, center, ground, step,
+                                          maxTicks)
+        near = (coarse >= 0) & (coarseHit <= (course.radii[ring] + STRIDE * step) ** 2)
+        holding, coarse = holding[near], coarse[near]
+
+        fine = (coarse[:, None] * STRIDE + np.arange(STRIDE + 1)) * step
+        points = helixPositions(y[holding], kappa[holding], tau[holding], fine)
+        exact, hit = firstCrossing(points, plane, center)
+        clear = ~np.logical_or.accumulate(belowGround(points, ground), axis=1)[np.arange(len(holding)), exact + 1]
+        good = (exact >= 0) & (hit <= radius2) & clear
+        ticks[holding[good]] = ramp + coarse[good] * STRIDE + exact[good] + 1
+        passed[holding[good]] = True
+
+    passed = np.flatnonzero(passed)
+    if not len(passed):
+        return []
+
+    # States when each leg passes its ring, the ring can be passed part way through the ramp
+    ends = np.empty((len(passed), 12))
+    inRamp = ticks[passed] <= ramp
+    ends[inRamp] = states[passed[inRamp], ticks[passed[inRamp]]]
+    held = passed[~inRamp]
+    ends[~inRamp] = propagate_frenet_serre_batch(y[held], kappa[held], tau[held], (ticks[held] - ramp) * step)
+
+    total = np.array([leg.ticks for leg in legs])[parent[passed]] + ticks[passed]
+    effort = np.abs(target[passed]).sum(axis=1)
+    out = []
+    for j in rank(ends, total, effort, course, ring + 1)[:beam]:
+        i = passed[j]
+        leg, tick = legs[parent[i]], int(ticks[i])
+        r = min(tick, ramp)
+        goal = (int(target[i, 0]), int(target[i, 1]))
+        reached = tuple(u + max(min(g - u, r), -r) for u, g in zip(leg.units, goal))
+        out.append(Leg(ends[j], float(kappas[i, r]), float(taus[i, r]), reached, int(total[j]),
+                       leg.schedule + [Segment(goal[0], goal[1], tick)]))
+
+    return out
+
+
+def solve(rings: Union[Course, Sequence[Ring]], state: FlightState = None, ground: Heightfield = None,
+          scale: float = SCALE, step: float = STEP, kappas: Sequence[int] = KAPPAS, taus: Sequence[int] = TAUS,
+          beam: int = 4, maxTicks: int = 2000) -> Optional[Solution]:
+    """
+    Search for a schedule of controls flying the rings in order from state,
+    by default FlightState.start(), keeping the `beam` best legs to each
+    ring. Each leg holds its ring's controls toward a (kappa, tau) of the
+    grid kappas x taus, in multiples of the control scale, for at most
+    maxTicks ticks once they are reached.
+
+    The commands found are checked by flying them with Flight, so a
+    solution returned always completes the course. None if no schedule was
+    found, which does not prove the course cannot be flown.
+    """
+    course = rings if isinstance(rings, Course) else Course.fromRings(rings)
+    start = state.copy() if state is not None else FlightState.start()
+    grid = np.array([(k, t) for k in kappas for t in taus], dtype=np.int64)
+
+    units = (int(round(start.kappa / scale)), int(round(start.tau / scale)))
+    legs = [Leg(start.y, start.kappa, start.tau, units, 0, [])]
+    for ring in range(len(course)):
+        legs = flyLegs(legs, grid, course, ring, ground, scale, step, maxTicks, beam)
+        if not legs:
+            return None
+
+    for leg in legs:
+        commands = scheduleCommands(leg.schedule, units)
+        flight = Flight(start.copy(), course, scale=scale, step=step, ground=ground)
+        flight.run(commands)
+        if flight.state.status == COMPLETE:
+            return Solution(commands, leg.schedule, flight.state)
+
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("level", help="JSON level file")
+    parser.add_argument("--beam", type=int, default=4, help="legs kept to search the next ring from")
+    parser.add_argument("--terrain", default=TERRAIN_GROUND,
+                        help="compiled heightfield to crash into, by default the game's terrain from src.build")
+    parser.add_argument("--flat", action="store_true", help="crash into the flat plane at GROUND instead of terrain")
+    args = parser.parse_args(argv)
+
+    course = Course.fromLevel(args.level)
+
+    ground = None
+    if not args.flat:
+        if not os.path.exists(args.terrain):
+            parser.error("no heightfield at %s, compile the game's terrain with python -m src.build or pass --flat"
+                         % args.terrain)
+        ground = Heightfield.load(args.terrain)
+
+    begin = time.perf_counter()
+    solution = solve(course, ground=ground, beam=args.beam)
+    elapsed = time.perf_counter() - begin
+
+    if solution is None:
+        print("No solution found for %s in %.3f s" % (course.name or args.level, elapsed))
+        return 1
+
+    print("%s solved in %.3f s, %d ticks" % (course.name or args.level, elapsed, len(solution.commands)))
+    for segment in solution.schedule:
+        print("kappa %+.3f tau %+.3f for %d ticks" % (segment.kappa * SCALE, segment.tau * SCALE, segment.ticks))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+from typing import Tuple
+
+import numpy as np
+
+# Initial position of every flight
+START = (10, 40, 40)
+
+# Flight status
+FLYING = 0
+CRASHED = 1
+COMPLETE = 2
+
+# Events returned by Flight.step
+RING_PASSED = 1 << 0
+CRASH = 1 << 1
+FINISHED = 1 << 2
+
+
+class FlightState:
+    """
+    State of a single flight. y holds the position and Frenet frame in the
+    layout documented in frenet_serre, (gamma, T, N, B).
+    """
+    __slots__ = ("y", "kappa", "tau", "tick", "ring", "status")
+
+    def __init__(self, y, kappa: float = 0.0, tau: float = 0.0, tick: int = 0, ring: int = 0,
+                 status: int = FLYING):
+        self.y = np.asarray(y, dtype=float)
+        self.kappa = kappa
+        self.tau = tau
+        self.tick = tick
+        self.ring = ring
+        self.status = status
+
+    @classmethod
+    def start(cls, p0: Tuple[float, float, float] = START,
+              tangent: Tuple[float, float, float] = (0, 1, 0),
+              normal: Tuple[float, float, float] = (1, 0, 0),
+              binormal: Tuple[float, float, float] = (0, 0, 1)) -> "FlightState":
+        """ State at the start of a flight with zero curvature and torsion """
+        return cls(np.concatenate((p0, tangent, normal, binormal)))
+
+    @property
+    def pos(self) -> np.ndarray:
+        return self.y[0:3]
+
+    @property
+    def T(self) -> np.ndarray:
+        return self.y[3:6]
+
+    @property
+    def N(self) -> np.ndarray:
+        return self.y[6:9]
+
+    @property
+    def B(self) -> np.ndarray:
+        return self.y[9:12]
+
+    def copy(self) -> "FlightState":
+        return FlightState(self.y.copy(), self.kappa, self.tau, self.tick, self.ring, self.status)
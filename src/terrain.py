@@ -0,0 +1,228 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Sequence, Tuple
+
+import numpy as np
+from panda3d.core import GeoMipTerrain, NodePath, PandaNode, PNMImage, StringStream
+
+from src.sim.heightfield import Heightfield
+
+CHUNK_SIZE = 256
+
+# Heights of the game's terrain, repeated in every chunk
+TERRAIN_HEIGHTFIELD = "models/terrain/black.gif"
+
+
+def imageHeights(path: str, size: int = CHUNK_SIZE + 1) -> np.ndarray:
+    """
+    Heights in [0, 1] from a greyscale image, resampled to size x size and
+    indexed [x, y] in terrain coordinates, y pointing up the image.
+    """
+    image = PNMImage(path)
+    image.makeGrayscale()
+    if image.getXSize() != size or image.getYSize() != size:
+        resized = PNMImage(size, size, 1, image.getMaxval())
+        resized.quickFilterFrom(image)
+        image = resized
+
+    stream = StringStream()
+    image.write(stream, "heights.pgm")
+    data = stream.getData()
+
+    # Binary PGM, the pixels follow the third newline of the header
+    start = 0
+    for _ in range(3):
+        start = data.index(b"\n", start) + 1
+    dtype = ">u2" if image.getMaxval() > 255 else "u1"
+    pixels = np.frombuffer(data, dtype=dtype, offset=start).reshape(size, size)
+
+    return np.ascontiguousarray(pixels[::-1].T, dtype=np.float32) / image.getMaxval()
+
+
+def heightsImage(heights: np.ndarray) -> PNMImage:
+    """ 16 bit greyscale image of heights in [0, 1] indexed [x, y], as GeoMipTerrain reads them """
+    size = heights.shape[0]
+    pixels = np.round(np.clip(heights, 0, 1).T[::-1] * 65535).astype(">u2")
+
+    image = PNMImage()
+    image.read(StringStream(b"P5\n%d %d\n65535\n" % (size, size) + pixels.tobytes()))
+
+    return image
+
+
+def tiled(heights: np.ndarray) -> Callable[[int, int], np.ndarray]:
+    """ Height source repeating the same heights in every chunk """
+    return lambda i, j: heights
+
+
+def tiledGround(heights: np.ndarray, chunkSize: int = CHUNK_SIZE, heightScale: float = 1.0) -> Heightfield:
+    """ Heightfield of the ground under terrain repeating the same heights in every chunk """
+    return Heightfield(heights, spacing=chunkSize / (len(heights) - 1), scale=heightScale, periodic=True)
+
+
+def terrainGround(path: str = TERRAIN_HEIGHTFIELD) -> Heightfield:
+    """ The ground flights in the game crash into, for flying them headless """
+    return tiledGround(imageHeights(path))
+
+
+class Chunk:
+    __slots__ = ("key", "level", "heights", "root")
+
+    def __init__(self, key: Tuple[int, int], level: int, heights: np.ndarray, root: NodePath):
+        self.key = key
+        self.level = level
+        self.heights = heights
+        self.root = root
+
+
+class TerrainManager:
+    """
+    Terrain paged in square chunks around a moving focus. Chunks within
+    `radius` chunks of the focus are shown, each built by a GeoMipTerrain on
+    a worker thread at a level of detail set by its distance, level i from
+    `lodDistances[i - 1]` chunks away. Chunks out of range are kept hidden
+    for when the focus returns until `maxChunks` are held, then the least
+    recently used are dropped.
+
+    `source(i, j)` gives the heights in [0, 1] of chunk (i, j), an array of
+    chunkSize + 1 squared values indexed [x, y], scaled by `heightScale`.
+    """
+
+    def __init__(self, source: Callable[[int, int], np.ndarray], texture=None,
+                 chunkSize: int = CHUNK_SIZE, heightScale: float = 1.0, radius: int = 3,
+                 lodDistances: Sequence[int] = (1, 2, 3), maxChunks: int = 64):
+        if (2 * radius + 1) ** 2 > maxChunks:
+            raise ValueError("maxChunks %d cannot hold every chunk within radius %d" % (maxChunks, radius))
+
+        self.source = source
+        self.texture = texture
+        self.chunkSize = chunkSize
+        self.heightScale = heightScale
+        self.radius = radius
+        self.lodDistances = tuple(lodDistances)
+        self.maxChunks = maxChunks
+
+        self.node = NodePath(PandaNode("terrain"))
+        self.chunks: Dict[Tuple[int, int], Chunk] = OrderedDict()
+        self.pending = {}
+        self.center = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="terrain")
+
+    def chunkAt(self, x: float, y: float) -> Tuple[int, int]:
+        return int(x // self.chunkSize), int(y // self.chunkSize)
+
+    def level(self, key: Tuple[int, int], center: Tuple[int, int]) -> int:
+        distance = max(abs(key[0] - center[0]), abs(key[1] - center[1]))
+        return sum(distance >= d for d in self.lodDistances)
+
+    def wanted(self, center: Tuple[int, int]) -> Dict[Tuple[int, int], int]:
+        """ Level of detail of each chunk to show around center """
+        ci, cj = center
+        return {
+            (i, j): self.level((i, j), center)
+            for i in range(ci - self.radius, ci + self.radius + 1)
+            for j in range(cj - self.radius, cj + self.radius + 1)
+        }
+
+    def build(self, key: Tuple[int, int], level: int, heights: np.ndarray) -> Chunk:
+        """ Generate the geometry of a chunk, run on the worker thread """
+        if heights is None:
+            heights = self.source(*key)
+
+        terrain = GeoMipTerrain("terrain %d %d" % key)
+        terrain.setHeightfield(heightsImage(heights))
+        terrain.setBruteforce(True)
+        terrain.setMinLevel(level)
+        terrain.setAutoFlatten(GeoMipTerrain.AFM_strong)
+
+        root = terrain.getRoot()
+        scale = self.chunkSize / (heights.shape[0] - 1)
+        root.setScale(scale, scale, self.heightScale)
+        root.setPos(key[0] * self.chunkSize, key[1] * self.chunkSize, 0)
+        if self.texture is not None:
+            root.setTexture(self.texture)
+        terrain.generate()
+
+        return Chunk(key, level, heights, root)
+
+    def request(self, key: Tuple[int, int], level: int):
+        if (key, level) in self.pending:
+            return
+
+        chunk = self.chunks.get(key)
+        heights = chunk.heights if chunk is not None else None
+        self.pending[(key, level)] = self.executor.submit(self.build, key, level, heights)
+
+    def update(self, pos: Tuple[float, float, float]):
+        """ Page chunks in and out around pos, only doing work when the focus changes chunk or chunks arrive """
+        center = self.chunkAt(pos[0], pos[1])
+        if center == self.center and not self.pending:
+            return
+
+        self.center = center
+        wanted = self.wanted(center)
+
+        for (key, level), future in list(self.pending.items()):
+            if future.done():
+                del self.pending[(key, level)]
+                self.add(future.result(), wanted)
+
+        # Nearest first, so the worker builds the chunks under the focus before those around it
+        for key, level in sorted(wanted.items(), key=lambda item: item[1]):
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                # Shown at its old level of detail until the new one is built
+                self.chunks.move_to_end(key)
+                if not chunk.root.hasParent():
+                    chunk.root.reparentTo(self.node)
+            if chunk is None or chunk.level != level:
+                self.request(key, level)
+
+        for key, chunk in self.chunks.items():
+            if key not in wanted:
+                chunk.root.detachNode()
+
+        self.evict()
+
+    def add(self, chunk: Chunk, wanted: Dict[Tuple[int, int], int]):
+        """ Replace any older version of the chunk, showing it if it is in range """
+        old = self.chunks.pop(chunk.key, None)
+        if old is not None:
+            if wanted.get(chunk.key) != chunk.level and wanted.get(chunk.key) == old.level:
+                # The focus moved back while this level was being built
+                self.chunks[chunk.key] = old
+                return
+            old.root.removeNode()
+
+        self.chunks[chunk.key] = chunk
+        if chunk.key in wanted:
+            chunk.root.reparentTo(self.node)
+
+    def evict(self):
+        """ Drop the least recently used hidden chunks over the budget """
+        for key in list(self.chunks):
+            if len(self.chunks) <= self.maxChunks:
+                break
+            if not self.chunks[key].root.hasParent():
+                self.chunks.pop(key).root.removeNode()
+
+    def load(self, pos: Tuple[float, float, float]):
+        """
+        Queue the chunks around pos and wait for the one under it, so the
+        ground is there from the first frame and the rest arrive on later
+        updates
+        """
+        self.center = None
+        self.update(pos)
+        key = self.chunkAt(pos[0], pos[1])
+        future = self.pending.get((key, self.level(key, key)))
+        if future is not None:
+            future.result()
+        self.update(pos)
+
+    def destroy(self):
+        """ Drop every chunk and stop the worker, abandoning chunks still being built """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.pending.clear()
+        self.chunks.clear()
+        self.node.removeNode()
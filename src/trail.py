@@ -0,0 +1,115 @@
+from typing import Tuple
+
+import numpy as np
+from panda3d.core import Geom, GeomLines, GeomLinestrips, GeomNode, GeomVertexData, GeomVertexFormat, \
+    GeomVertexWriter, NodePath, OmniBoundingVolume
+
+
+def _vertexArray(vdata: GeomVertexData) -> np.ndarray:
+    """ Writable (rows, 3) float32 view of the vertex column of a V3 vertex data """
+    return np.frombuffer(memoryview(vdata.modifyArray(0)).cast('B'), dtype=np.float32).reshape(-1, 3)
+
+
+def _lineNode(name: str, vdata: GeomVertexData, prim, color: Tuple[float, float, float, float],
+              thickness: float) -> NodePath:
+    """ Wrap a primitive in a GeomNode which is never culled, so its bounds are never recomputed """
+    geom = Geom(vdata)
+    geom.addPrimitive(prim)
+
+    node = GeomNode(name)
+    node.addGeom(geom)
+    node.setBounds(OmniBoundingVolume())
+    node.setFinal(True)
+
+    nodePath = NodePath(node)
+    nodePath.setColor(color)
+    nodePath.setRenderModeThickness(thickness)
+    nodePath.setLightOff()
+
+    return nodePath
+
+
+class TrailLine:
+    """
+    Line through the last `capacity` points appended to it.
+
+    The vertices live in a preallocated ring buffer and segment i joins
+    vertex i to vertex i + 1 (mod capacity). Appending a point overwrites the
+    oldest vertex, enables the segment to it and collapses the segment that
+    joined it to the rest of the trail, so each append writes one vertex and
+    four indices regardless of the length of the flight.
+    """
+
+    def __init__(self, name: str, capacity: int,
+                 color: Tuple[float, float, float, float] = (1, 1, 1, 1), thickness: float = 4):
+        self.capacity = capacity
+        self.head = 0
+        self.count = 0
+
+        self.vdata = GeomVertexData(name, GeomVertexFormat.getV3(), Geom.UHDynamic)
+        self.vdata.setNumRows(capacity)
+
+        self.lines = GeomLines(Geom.UHDynamic)
+        self.lines.setIndexType(Geom.NT_uint32)
+        self.lines.modifyVertices().setNumRows(2 * capacity)
+
+        self.node = _lineNode(name, self.vdata, self.lines, color, thickness)
+        self.clear()
+
+    def clear(self):
+        """ Remove every point, collapsing all segments """
+        self.head = 0
+        self.count = 0
+
+        indices = np.frombuffer(memoryview(self.lines.modifyVertices()).cast('B'), dtype=np.uint32)
+        indices[:] = np.repeat(np.arange(self.capacity, dtype=np.uint32), 2)
+
+    def append(self, point: Tuple[float, float, float]):
+        """ Add a point to the end of the trail, dropping the oldest point when full """
+        vertex = GeomVertexWriter(self.vdata, 'vertex')
+        vertex.setRow(self.head)
+        vertex.setData3(point[0], point[1], point[2])
+
+        index = GeomVertexWriter(self.lines.modifyVertices(), 0)
+        # The segment leaving the new vertex pointed at the next oldest point
+        index.setRow(2 * self.head + 1)
+        index.setData1i(self.head)
+
+        if self.count > 0:
+            prev = (self.head - 1) % self.capacity
+            index.setRow(2 * prev + 1)
+            index.setData1i(self.head)
+
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def __len__(self):
+        return self.count
+
+
+class CurveLine:
+    """ Line strip through at most `capacity` points, replaced in place each frame """
+
+    def __init__(self, name: str, capacity: int,
+                 color: Tuple[float, float, float, float] = (1, 1, 0, 1), thickness: float = 4):
+        self.capacity = capacity
+
+        self.vdata = GeomVertexData(name, GeomVertexFormat.getV3(), Geom.UHDynamic)
+        self.vdata.setNumRows(capacity)
+
+        self.strip = GeomLinestrips(Geom.UHDynamic)
+        self.node = _lineNode(name, self.vdata, self.strip, color, thickness)
+
+    def clear(self):
+        self.strip.clearVertices()
+
+    def setPoints(self, points: np.ndarray):
+        """ Replace the curve with the (n, 3) array of points, truncated to the capacity """
+        n = min(len(points), self.capacity)
+
+        _vertexArray(self.vdata)[:n] = points[:n]
+
+        self.strip.clearVertices()
+        if n > 1:
+            self.strip.addConsecutiveVertices(0, n)
+            self.strip.closePrimitive()
@@ -0,0 +1,36 @@
+import pytest
+
+from src.clock import FixedTimestep, lerp, lerpHpr
+
+
+def test_ticks_at_a_fixed_rate_whatever_the_frame_times():
+    # Frame times exact in binary, so no rounding is carried between frames
+    clock = FixedTimestep(rate=64)
+    ticks = [clock.advance(frame) for frame in [1 / 128] * 128 + [1 / 32] * 32 + [0.0, -1.0]]
+
+    assert ticks[:4] == [0, 1, 0, 1]
+    assert ticks[128:130] == [2, 2]
+    assert sum(ticks) == clock.tick == 128
+    assert clock.alpha == 0
+
+
+def test_alpha_is_the_fraction_of_the_next_tick():
+    clock = FixedTimestep(rate=100)
+    assert clock.advance(0.025) == 2
+    assert clock.alpha == pytest.approx(0.5)
+
+
+def test_slow_frames_drop_time_instead_of_spiralling():
+    clock = FixedTimestep(rate=60, maxTicks=5)
+    assert clock.advance(1.0) == 5
+    assert clock.dropped == 55
+    assert clock.advance(1 / 60) == 1
+
+    clock.reset()
+    assert (clock.tick, clock.dropped, clock.alpha) == (0, 0, 0)
+
+
+def test_interpolation():
+    assert lerp((0, 0, 0), (2, 4, 6), 0.25) == (0.5, 1, 1.5)
+    # Heading goes the short way round from 350 to 10 degrees
+    assert lerpHpr((350, 0, 0), (10, 0, 0), 0.5)[0] % 360 == pytest.approx(0)
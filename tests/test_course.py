@@ -0,0 +1,81 @@
+import json
+
+import numpy as np
+
+from src.sim import Course, circleCourse
+
+LEVEL = {
+    "name": "Test",
+    "description": "Two discs",
+    "rings": [
+        {"center": [0, 100, 40], "normal": [0, 2, 0], "radius": 10},
+        {"center": [50, 50, 40], "normal": [1, 0, 0], "radius": 5}
+    ]
+}
+
+
+def test_crosses_inside_the_disc():
+    course = Course.fromSpec(LEVEL)
+    assert course.crosses(0, (3, 99, 44), (3, 101, 44))
+    assert course.crosses(0, (3, 101, 44), (3, 99, 44))
+    assert course.crosses(1, (49, 50, 41), (51, 50, 41))
+
+
+def test_crosses_only_through_the_interior():
+    course = Course.fromSpec(LEVEL)
+    # Outside the radius, short of the plane, and along the plane
+    assert not course.crosses(0, (11, 99, 40), (11, 101, 40))
+    assert not course.crosses(0, (0, 90, 40), (0, 99, 40))
+    assert not course.crosses(0, (-5, 100, 40), (5, 100, 40))
+
+
+def test_fast_segments_cannot_tunnel():
+    course = Course.fromSpec(LEVEL)
+    assert course.crosses(0, (0, -1000, 40), (0, 1000, 40))
+
+
+def test_crosses_many_matches_crosses():
+    course = Course.fromSpec(LEVEL)
+    rng = np.random.default_rng(1)
+    rings = rng.integers(0, 2, 1000)
+    p0 = rng.uniform((-20, 40, 20), (70, 120, 60), (1000, 3))
+    p1 = p0 + rng.normal(0, 10, (1000, 3))
+    p1[:10] = p0[:10]
+
+    expected = [course.crosses(i, a, b) for i, a, b in zip(rings, p0, p1)]
+    assert any(expected)
+    assert course.crossesMany(rings, p0, p1).tolist() == expected
+
+
+def test_level_circle_matches_circle_course():
+    spec = {"rings": [{"circle": {"center": [110, 110, 40], "radius": 100, "ringRadius": 10}}]}
+    course = Course.fromSpec(spec)
+    rings = circleCourse()
+
+    assert len(course) == len(rings)
+    assert np.allclose(course.centers, [ring.center for ring in rings])
+    assert np.allclose(course.normals, [ring.normal for ring in rings])
+
+
+def test_transforms_take_the_unit_circle_onto_the_ring():
+    course = Course.fromSpec(LEVEL)
+    u = np.linspace(0, 2 * np.pi, 16)
+    circle = np.column_stack((np.cos(u), np.zeros_like(u), np.sin(u), np.ones_like(u)))
+
+    for i in range(len(course)):
+        points = (circle @ course.transforms[i])[:, 0:3]
+        assert np.allclose(np.linalg.norm(points - course.centers[i], axis=1), course.radii[i])
+        assert np.allclose((points - course.centers[i]) @ course.normals[i], 0)
+        assert np.allclose(course.transforms[i] @ course.inverses[i], np.eye(4))
+
+
+def test_save_and_load(tmp_path):
+    level = tmp_path / "level.json"
+    level.write_text(json.dumps(LEVEL))
+    course = Course.fromLevel(str(level))
+    course.save(str(tmp_path / "level.npz"))
+
+    loaded = Course.load(str(tmp_path / "level.npz"))
+    assert (loaded.name, loaded.description) == ("Test", "Two discs")
+    for key in Course.ARRAYS:
+        assert np.array_equal(getattr(loaded, key), getattr(course, key))
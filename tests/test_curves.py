@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+from scipy.integrate import odeint
+
+from src.curves import (adaptive_samples, frenet_serre, integrate_frenet_serre, propagate_frenet_serre,
+                        propagate_frenet_serre_batch)
+
+P0, T0, N0, B0 = (1.0, 2.0, 3.0), (0.0, 1.0, 0.0), (1.0, 0.0, 0.0), (0.0, 0.0, -1.0)
+Y0 = np.array(P0 + T0 + N0 + B0)
+
+CONTROLS = [(0.0, 0.0), (0.05, 0.0), (0.0, 0.05), (0.2, -0.1), (-0.5, 0.5), (1e-6, 1e-6)]
+
+
+def exact(kappa, tau, s):
+    """ Frenet Serre equations integrated by odeint far below the closed form's error """
+    return odeint(frenet_serre, Y0, s, args=(kappa, tau), rtol=1e-13, atol=1e-13)
+
+
+@pytest.mark.parametrize("kappa, tau", CONTROLS)
+def test_closed_form_matches_odeint(kappa, tau):
+    s = np.linspace(0, 150, 301)
+    assert np.abs(propagate_frenet_serre(P0, T0, N0, B0, kappa, tau, s) - exact(kappa, tau, s)).max() < 1e-8
+
+
+@pytest.mark.parametrize("kappa, tau", CONTROLS)
+@pytest.mark.parametrize("s", [0.1, 1.0, 25.0])
+def test_single_step_matches_arrays(kappa, tau, s):
+    single = propagate_frenet_serre(np.array(P0), np.array(T0), np.array(N0), np.array(B0), kappa, tau, s)
+    assert single.shape == (12,)
+    assert np.allclose(single, propagate_frenet_serre(P0, T0, N0, B0, kappa, tau, np.array([s]))[0],
+                       rtol=0, atol=1e-12)
+
+
+def test_frame_stays_orthonormal():
+    y = propagate_frenet_serre(P0, T0, N0, B0, 0.3, -0.2, np.linspace(0, 1000, 11))
+    frames = y[:, 3:12].reshape(-1, 3, 3)
+    assert np.allclose(frames @ frames.transpose(0, 2, 1), np.eye(3), atol=1e-12)
+
+
+def test_batch_matches_single_curves():
+    rng = np.random.default_rng(0)
+    kappa, tau = rng.uniform(-0.3, 0.3, (2, 20))
+    s = rng.uniform(0, 10, 20)
+    batch = propagate_frenet_serre_batch(np.tile(Y0, (20, 1)), kappa, tau, s)
+
+    for i in range(20):
+        assert np.allclose(batch[i], propagate_frenet_serre(P0, T0, N0, B0, kappa[i], tau[i], s[i]), atol=1e-12)
+
+
+def test_magnus_is_exact_for_constant_controls():
+    s = np.linspace(0, 150, 16)
+    assert np.allclose(integrate_frenet_serre(P0, T0, N0, B0, 0.1, 0.05, s),
+                       propagate_frenet_serre(P0, T0, N0, B0, 0.1, 0.05, s), atol=1e-10)
+
+
+def test_magnus_converges_at_fourth_order():
+    kappa = lambda s: 0.1 + 0.05 * np.sin(s / 10)
+    tau = lambda s: 0.02 * np.cos(s / 7)
+    s = np.linspace(0, 100, 1001)
+    reference = odeint(lambda y, t: frenet_serre(y, t, kappa(t), tau(t)), Y0, s, rtol=1e-12, atol=1e-12)[-1]
+
+    errors = [np.abs(integrate_frenet_serre(P0, T0, N0, B0, kappa, tau, np.linspace(0, 100, n + 1))[-1]
+                     - reference).max() for n in (40, 80)]
+    assert errors[0] < 1e-3
+    # Halving the step divides the error by about 2^4
+    assert errors[0] / errors[1] > 12
+
+
+def test_adaptive_samples_keep_chords_within_tolerance():
+    kappa, tolerance = 0.05, 0.02
+    s = adaptive_samples(kappa, 150, tolerance)
+    assert s[0] == 0 and s[-1] == 150
+
+    # The sagitta of a chord spanning arc length h on a circle of radius 1 / kappa
+    h = np.diff(s).max()
+    assert (1 - np.cos(h * kappa / 2)) / kappa <= tolerance + 1e-12
+    assert len(adaptive_samples(0, 150, tolerance)) == 2
@@ -0,0 +1,61 @@
+import numpy as np
+
+from src.sim import (CRASH, CRASHED, COMPLETE, CURV_DOWN, CURV_UP, FINISHED, FLYING, RING_PASSED, TOR_UP, Course,
+                     Flight, FlightBatch, FlightState, Heightfield, circleCourse)
+
+# Straight to the first ring of the tutorial then around the circle
+TUTORIAL = [0] * 695 + [CURV_UP] * 10 + [0] * 5000
+
+
+def test_tutorial_completes():
+    flight = Flight(FlightState.start(), circleCourse())
+    events = flight.run(TUTORIAL)
+
+    assert flight.state.status == COMPLETE
+    assert flight.state.ring == 9
+    assert sum(1 for e in events if e & RING_PASSED) == 9
+    assert events[-1] & FINISHED
+    # The flight stops at the end, so the commands left over are not run
+    assert len(events) == flight.state.tick < len(TUTORIAL)
+
+
+def test_rings_are_passed_in_order():
+    # The second ring is flown through first, and does not count until the first has been passed
+    course = Course.fromRings(circleCourse()[:2][::-1])
+    flight = Flight(FlightState.start(), course)
+    flight.run(TUTORIAL)
+
+    assert flight.state.ring == 1
+    assert flight.state.status == FLYING
+
+
+def test_crashes_into_the_ground():
+    flight = Flight(FlightState.start(), circleCourse())
+    events = flight.run([CURV_DOWN] * 20 + [TOR_UP] * 400 + [0] * 5000)
+    assert flight.state.status == CRASHED
+    assert events[-1] == CRASH
+    assert flight.state.y[2] <= 0
+
+    # Rising ground is hit before the plane at zero
+    ground = Heightfield(np.full((2, 2), 39.0), spacing=1000)
+    flight = Flight(FlightState.start(), circleCourse(), ground=ground)
+    flight.run([CURV_DOWN] * 20 + [TOR_UP] * 400 + [0] * 5000)
+    assert flight.state.status == CRASHED
+    assert 38 < flight.state.y[2] <= 39
+
+
+def test_batch_matches_flight():
+    rng = np.random.default_rng(3)
+    ground = Heightfield(rng.uniform(0, 30, (9, 9)), spacing=40)
+    commands = rng.choice([0, 0, 0, CURV_UP, CURV_DOWN, TOR_UP], (24, 1500))
+    commands[:12] = np.array(TUTORIAL[:1500])
+
+    batch = FlightBatch(np.tile(FlightState.start().y, (24, 1)), circleCourse(), ground=ground)
+    batch.run(commands)
+
+    for i in range(24):
+        flight = Flight(FlightState.start(), circleCourse(), ground=ground)
+        flight.run(commands[i].tolist())
+        state = flight.state
+        assert (batch.status[i], batch.ring[i], batch.tick[i]) == (state.status, state.ring, state.tick)
+        assert np.allclose(batch.y[i], state.y, atol=1e-9)
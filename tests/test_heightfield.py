@@ -0,0 +1,63 @@
+import numpy as np
+
+from src.sim import Heightfield, belowGround, hitsGround
+
+
+def ramp() -> Heightfield:
+    """ Heights rising by 1 per sample in x, 2 units apart """
+    return Heightfield(np.repeat(np.arange(5.0)[:, None], 5, axis=1), spacing=2.0)
+
+
+def test_heights_are_bilinear():
+    ground = Heightfield([[0, 1], [2, 3]], spacing=10, scale=2)
+    assert ground.height(0, 0) == 0
+    assert ground.height(10, 10) == 6
+    assert np.isclose(ground.height(5, 5), 3)
+    assert np.allclose(ground.heights([0, 5, 10], [5, 5, 5]), [1, 3, 5])
+
+
+def test_edges_clamp_and_periodic_repeats():
+    assert ramp().height(100, 0) == 4
+    assert ramp().height(-100, 0) == 0
+
+    periodic = Heightfield([[0, 0], [1, 1], [0, 0]], spacing=1, periodic=True)
+    assert np.isclose(periodic.height(1, 0), 1)
+    assert np.isclose(periodic.height(3, 0), 1)
+    assert np.isclose(periodic.height(-1, 0), 1)
+
+
+def test_scalar_and_array_rules_agree():
+    ground = ramp()
+    rng = np.random.default_rng(2)
+    points = rng.uniform((-2, -2, -1), (10, 10, 5), (200, 3))
+
+    assert belowGround(points, ground).tolist() == [hitsGround(p, ground) for p in points]
+    assert belowGround(points).tolist() == [hitsGround(p) for p in points]
+
+
+def test_first_impact():
+    ground = ramp()
+    assert ground.firstImpact([(0, 0, -1), (1, 0, 5)]) == 0
+    assert ground.firstImpact([(0, 0, 10)]) == -1
+    assert ground.firstImpact([(0, 0, 10), (8, 0, 10)]) == -1
+    assert ground.firstImpact([(0, 0, 10), (1, 0, 10), (8, 0, 3)]) == 2
+
+
+def test_first_impact_finds_ridges_between_points():
+    heights = np.zeros((11, 2))
+    heights[5] = 10
+    ground = Heightfield(heights, spacing=1)
+
+    # Neither end of the chord is below ground, the ridge in between is
+    assert not ground.below(np.array([(0, 0, 5), (10, 0, 5)])).any()
+    assert ground.firstImpact([(0, 0, 5), (10, 0, 5)]) == 1
+
+
+def test_save_and_load(tmp_path):
+    ground = Heightfield(np.arange(9.0).reshape(3, 3), spacing=4, scale=0.5, origin=(1, 2), periodic=True)
+    ground.save(str(tmp_path / "ground.npz"))
+
+    loaded = Heightfield.load(str(tmp_path / "ground.npz"))
+    assert np.array_equal(loaded.data, ground.data)
+    assert (loaded.spacing, loaded.origin, loaded.periodic) == (4, (1, 2), True)
+    assert loaded.height(3.5, 7) == ground.height(3.5, 7)
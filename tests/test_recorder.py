@@ -0,0 +1,83 @@
+import os
+
+import numpy as np
+
+from src.sim import COMPLETE, CRASHED, CURV_DOWN, CURV_UP, TOR_UP, Flight, FlightState, circleCourse
+from src.sim.recorder import FlightLog, FlightRecorder, fastest, prune, readFinal, recordings
+
+TUTORIAL = [0] * 695 + [CURV_UP] * 10 + [0] * 5000
+CRASH = [CURV_DOWN] * 20 + [TOR_UP] * 400 + [0] * 5000
+
+
+def record(path: str, commands, interval: int = 600) -> Flight:
+    flight = Flight(FlightState.start(), circleCourse())
+    with FlightRecorder(path, flight, interval) as recorder:
+        for command in commands:
+            if flight.state.status != 0:
+                break
+            recorder.record(command, flight.step(command))
+
+    return flight
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "run-1.rec")
+    flight = record(path, TUTORIAL, interval=100)
+    log = FlightLog(path)
+
+    assert len(log) == flight.state.tick
+    assert log.commands.tolist() == TUTORIAL[:len(log)]
+    assert np.allclose(log.positions[-1], flight.state.pos, atol=1e-4)
+
+    # Re-simulating from the keyframes reproduces the flight exactly
+    for tick in (0, 1, 99, 100, 101, 2500, len(log)):
+        expected = Flight(FlightState.start(), circleCourse())
+        expected.run(TUTORIAL[:tick])
+        state = log.state(tick, circleCourse())
+        assert state.tick == tick
+        assert np.array_equal(state.y, expected.state.y)
+        assert (state.ring, state.status) == (expected.state.ring, expected.state.status)
+
+    assert np.array_equal(log.replay(circleCourse())[-1], flight.state.y)
+
+
+def test_read_final(tmp_path):
+    record(str(tmp_path / "run-1.rec"), TUTORIAL)
+    record(str(tmp_path / "run-2.rec"), CRASH)
+
+    final = readFinal(str(tmp_path / "run-1.rec"))
+    assert (final.status, final.ring) == (COMPLETE, 9)
+    assert final.tick == len(FlightLog(str(tmp_path / "run-1.rec")))
+    assert readFinal(str(tmp_path / "run-2.rec")).status == CRASHED
+
+
+def test_unclosed_recordings_have_no_final_state(tmp_path):
+    path = str(tmp_path / "run-1.rec")
+    flight = Flight(FlightState.start(), circleCourse())
+    recorder = FlightRecorder(path, flight, 600)
+    for command in TUTORIAL[:1000]:
+        recorder.record(command, flight.step(command))
+    recorder.flush()
+
+    assert readFinal(path) is None
+    assert len(FlightLog(path)) == 1000
+    recorder.close()
+
+    open(str(tmp_path / "run-2.rec"), "wb").close()
+    assert readFinal(str(tmp_path / "run-2.rec")) is None
+
+
+def test_fastest_and_prune(tmp_path):
+    directory = str(tmp_path)
+    # Completed flights of different lengths, turning onto the circle later the longer they take
+    for i, delay in enumerate((6, -4, 2, 0)):
+        record(os.path.join(directory, "level-%d.rec" % i), [0] * (695 + delay) + [CURV_UP] * 10 + [0] * 5000)
+    record(os.path.join(directory, "level-4.rec"), CRASH)
+    record(os.path.join(directory, "other-0.rec"), TUTORIAL)
+
+    paths = recordings(directory, "level")
+    assert [os.path.basename(path) for path in paths] == ["level-%d.rec" % i for i in range(5)]
+    assert [os.path.basename(path) for path in fastest(paths, 2)] == ["level-1.rec", "level-3.rec"]
+
+    prune(directory, "level", recent=1, best=2)
+    assert sorted(os.listdir(directory)) == ["level-1.rec", "level-3.rec", "level-4.rec", "other-0.rec"]